@@ -0,0 +1,95 @@
+"""
+SQLite-backed key/value store for cached results
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.helpers import json_dumps, json_loads
+
+DEFAULT_CACHE_DB = os.path.join('data', 'cache', 'cache.sqlite3')
+# Number of recently used entries kept in memory in front of the database
+DEFAULT_MEMORY_ENTRIES = 1024
+
+class CacheStore:
+    """Single-file keyed cache with a write timestamp per entry"""
+
+    def __init__(self, path=DEFAULT_CACHE_DB, memory_entries=DEFAULT_MEMORY_ENTRIES):
+        """Open (or create) the cache database at the given path"""
+        self.path = path
+        self.memory_entries = memory_entries
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # LRU of key -> (ts, blob); blobs are decoded on every hit so callers never share objects
+        self._memory = OrderedDict()
+
+        # One shared connection; the lock serializes access across threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, ts REAL, blob BLOB)')
+        self._conn.commit()
+
+    def get(self, key, max_age):
+        """Return the value stored under key if it was written less than max_age seconds ago"""
+        min_ts = time.time() - max_age
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                # The database holds the same ts, so an expired memory entry is expired there too
+                if entry[0] <= min_ts:
+                    return None
+                self._memory.move_to_end(key)
+                blob = entry[1]
+            else:
+                row = self._conn.execute(
+                    'SELECT blob, ts FROM cache WHERE key = ? AND ts > ?',
+                    (key, min_ts)
+                ).fetchone()
+                if row is None:
+                    return None
+                blob = row[0]
+                self._remember(key, row[1], blob)
+
+        return json_loads(blob)
+
+    def set(self, key, data):
+        """Store data under key, replacing any previous entry"""
+        blob = json_dumps(data)
+        ts = time.time()
+        with self._lock:
+            self._remember(key, ts, blob)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (key, ts, blob) VALUES (?, ?, ?)',
+                (key, ts, blob)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every entry from the store"""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute('DELETE FROM cache')
+            self._conn.commit()
+
+    def _remember(self, key, ts, blob):
+        """Put an entry in the in-memory LRU, evicting the least recently used one when full (lock held)"""
+        self._memory[key] = (ts, blob)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+# Stores are shared per database file so every analyzer reuses one connection
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_cache_store(path=DEFAULT_CACHE_DB):
+    """Get the shared CacheStore for a database path"""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = CacheStore(path)
+        return _stores[path]
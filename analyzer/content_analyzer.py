@@ -1,13 +1,208 @@
 import os
 import json
 import re
+import asyncio
+import hashlib
+import threading
 from datetime import datetime
+from functools import lru_cache
 import sys
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional; fall back to one str.count per indicator
+    ahocorasick = None
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; prompts are then truncated by characters
+    tiktoken = None
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.helpers import get_cache_path
 
-# Import LLM interface
-from .llm_interface import query_llm, extract_json_from_response
+# Import LLM interface and the shared cache store
+from .llm_interface import query_llm, aquery_llm, query_many, run_async, extract_json_from_response
+from .cache_store import get_cache_store
+
+# Fields and guidelines shared by the single-site and batch analysis prompts
+ANALYSIS_FIELDS = """
+- company_name: The name of the company
+- industry: The specific industry or sector the company operates in (be detailed, not general)
+- company_type: Whether the company is B2B, B2C, Government, or Non-profit
+- company_size: Estimated company size (small, medium, large)
+- target_market: Who the company sells to (B2B, B2C, or both) - BE SPECIFIC about the types of customers
+- offerings: List of SPECIFIC products or services the company offers (at least 3-5 items if possible)
+- pain_points: List of problems or challenges the company's customers face that its offerings address
+- company_description: A brief description of what the company does
+- location: Company headquarters location if mentioned
+- founded_year: When the company was founded if mentioned
+- key_people: Key executives or team members if mentioned
+- contact_info: Contact information if available
+- social_media: Social media links if available
+
+IMPORTANT GUIDELINES:
+1. For offerings: List SPECIFIC named products/services, not general categories
+2. For target_market: Be specific about the types of customers (e.g., "Enterprise healthcare providers" not just "B2B")
+3. NEVER use "Unknown - LLM analysis required" - make your best inference based on the content
+4. If information isn't explicitly stated, make reasonable inferences based on the content
+"""
+
+# Static parts of the single-site analysis prompt; the website content goes between them, after the
+# shared instructions, so the prompt prefix is identical across requests
+_PROMPT_HEAD = f"""
+        You are a business analyst expert. Analyze the following website content and extract key information about the company.
+        
+        IMPORTANT: Focus especially on identifying SPECIFIC offerings/products/services and the target market.
+        
+        Return the results in JSON format with the following fields:
+        {ANALYSIS_FIELDS}
+        
+        Website Content:
+        """
+_PROMPT_TAIL = """  # Limit content to avoid token limits
+        
+        Return ONLY valid JSON without any additional text or explanation.
+        """
+
+# Static start of the batch prompt. Everything that varies (the website count and contents) comes
+# after it, so every batch request shares the same prefix and can hit the provider's prompt cache
+_BATCH_PROMPT_HEAD = f"""
+        You are a business analyst expert. Analyze each of the following websites and extract key information about each company.
+        
+        IMPORTANT: Focus especially on identifying SPECIFIC offerings/products/services and the target market.
+        
+        Return a JSON object with a "results" array holding one object per website, in the order given, each with the following fields:
+        {ANALYSIS_FIELDS}
+        
+        """
+
+# Indicator terms for the rule-based fallback; _scan_all looks for all of them in one scan
+_COMPANY_TYPE_INDICATORS = {
+    'B2B': ['business', 'enterprise', 'organization', 'company', 'client', 'solution'],
+    'B2C': ['consumer', 'customer', 'individual', 'personal', 'user', 'people'],
+    'Government': ['government', 'public sector', 'agency', 'federal', 'state', 'municipal'],
+    'Non-profit': ['non-profit', 'nonprofit', 'charity', 'foundation', 'community', 'donation']
+}
+
+_INDUSTRY_INDICATORS = {
+    'Technology': ['tech', 'software', 'it', 'computing', 'digital', 'ai', 'artificial intelligence'],
+    'Healthcare': ['health', 'medical', 'hospital', 'pharma', 'doctor', 'patient', 'clinic'],
+    'Finance': ['finance', 'bank', 'investment', 'insurance', 'loan', 'mortgage', 'financial'],
+    'Education': ['education', 'school', 'university', 'college', 'learning', 'student', 'teacher'],
+    'Manufacturing': ['manufacturing', 'factory', 'production', 'industrial', 'machinery'],
+    'Retail': ['retail', 'shop', 'store', 'ecommerce', 'product', 'consumer'],
+    'Consulting': ['consulting', 'consultant', 'advisor', 'professional service']
+}
+
+# Industries in priority order, and the highest-priority industry each term points to
+_INDUSTRY_NAMES = list(_INDUSTRY_INDICATORS)
+_INDUSTRY_RANK_BY_TERM = {}
+for _rank, _terms in enumerate(_INDUSTRY_INDICATORS.values()):
+    for _term in _terms:
+        _INDUSTRY_RANK_BY_TERM.setdefault(_term, _rank)
+
+# Company size indicators, checked from largest to smallest
+_SIZE_INDICATORS = [
+    ('Large', ['enterprise', 'corporation', 'global', 'nationwide', 'international']),
+    ('Medium', ['growing', 'mid-size', 'medium']),
+    ('Small', ['small', 'startup', 'founder', 'small business'])
+]
+_TEAM_SIZE_RE = re.compile(r'team of (\d+)', re.IGNORECASE)
+
+# Target market indicators
+_B2B_MARKET_INDICATORS = ['enterprise', 'business', 'companies', 'organizations', 'firms']
+_B2C_MARKET_INDICATORS = ['consumer', 'individual', 'personal', 'people', 'family']
+_INDUSTRY_MARKET_INDICATORS = ['healthcare', 'finance', 'retail', 'education', 'manufacturing', 'technology']
+
+_WORD_INDICATOR_TERMS = (
+    {term for terms in _INDUSTRY_INDICATORS.values() for term in terms}
+    | {term for _, terms in _SIZE_INDICATORS for term in terms}
+    | set(_B2B_MARKET_INDICATORS + _B2C_MARKET_INDICATORS + _INDUSTRY_MARKET_INDICATORS)
+)
+# Terms whose original checks matched the unlowered text case-insensitively
+_SIZE_MARKET_TERMS = (
+    {term for _, terms in _SIZE_INDICATORS for term in terms}
+    | set(_B2B_MARKET_INDICATORS + _B2C_MARKET_INDICATORS + _INDUSTRY_MARKET_INDICATORS)
+)
+_WORD_RE = re.compile(r'\w+')
+# Terms spanning several words can't be matched against single tokens
+_COMPOUND_INDICATOR_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(term) for term in _WORD_INDICATOR_TERMS if not _WORD_RE.fullmatch(term)) + r')\b'
+)
+
+# One automaton over every indicator (company type substrings and whole-word terms), so the
+# rule-based scan is a single pass over the text when pyahocorasick is installed
+_COMPANY_TYPE_TERMS = frozenset(term for terms in _COMPANY_TYPE_INDICATORS.values() for term in terms)
+if ahocorasick is not None:
+    _INDICATOR_AUTOMATON = ahocorasick.Automaton()
+    for _term in _COMPANY_TYPE_TERMS | _WORD_INDICATOR_TERMS:
+        _INDICATOR_AUTOMATON.add_word(_term, _term)
+    _INDICATOR_AUTOMATON.make_automaton()
+else:
+    _INDICATOR_AUTOMATON = None
+_WORD_CHAR_RE = re.compile(r'\w')
+
+# The patterns below are written in lowercase and run against the lowercased content,
+# which is much cheaper than re.IGNORECASE; captures are sliced back out of the original
+
+# Pain point indicators; kept as separate patterns so results stay grouped by indicator
+_PAIN_POINT_PATTERNS = [
+    re.compile(r'(?:' + indicator + r')\s+([^.!?;]+)')
+    for indicator in [
+        'challenge', 'problem', 'struggle', 'difficulty', 'obstacle',
+        'improve', 'optimize', 'streamline', 'enhance', 'simplify',
+        'reduce costs', 'save time', 'increase efficiency'
+    ]
+]
+
+# Offerings extraction patterns
+_SERVICE_SECTION_RE = re.compile(r'(?:our|key|main)\s+(?:services|products|solutions|offerings)(?:[:\s]*)([^#]+?)(?:\n\n|$)')
+_LIST_ITEM_RE = re.compile(r'(?:•|\*|\-|\d+\.)\s*([^\n•\*\-\d]+)')
+_OFFER_STATEMENT_RE = re.compile(r'(?:we|our company)\s+(?:provide|offer|deliver|specialize in)\s+([^.]+)')
+_STATEMENT_SPLIT_RE = re.compile(r'\s+and\s+|,\s*')
+
+# Typical offerings per industry, used when none can be extracted from the content
+INDUSTRY_OFFERINGS = {
+    'Technology': ['Software Development', 'IT Consulting', 'Cloud Services', 'Data Analytics', 'Cybersecurity'],
+    'Healthcare': ['Medical Services', 'Healthcare IT', 'Patient Management', 'Medical Equipment', 'Telehealth'],
+    'Finance': ['Financial Services', 'Investment Management', 'Banking Solutions', 'Insurance', 'Payment Processing'],
+    'Education': ['Educational Content', 'Learning Management', 'Student Services', 'Educational Technology', 'Training Programs'],
+    'Manufacturing': ['Production Services', 'Supply Chain Management', 'Quality Control', 'Equipment Manufacturing', 'Industrial Design'],
+    'Retail': ['E-commerce Solutions', 'Inventory Management', 'Customer Experience', 'Point of Sale Systems', 'Retail Analytics'],
+    'Consulting': ['Business Strategy', 'Management Consulting', 'Process Improvement', 'Change Management', 'Industry Expertise']
+}
+
+@lru_cache(maxsize=64)
+def _infer_offerings(industry, company_type):
+    """Pick fallback offerings for an industry/company type pair (returns a tuple so it can be cached)"""
+    if industry in INDUSTRY_OFFERINGS:
+        # Return the top 3 most relevant offerings for this industry
+        return tuple(INDUSTRY_OFFERINGS[industry][:3])
+    
+    # Generic offerings based on company type
+    if company_type == 'B2B':
+        return ('Business Services', 'Professional Solutions', 'Enterprise Software')
+    elif company_type == 'B2C':
+        return ('Consumer Products', 'Customer Services', 'Retail Solutions')
+    else:
+        return ('Professional Services', 'Industry Solutions', 'Specialized Expertise')
+
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """Load the tokenizer used for MAX_CONTENT_TOKENS, or None if tiktoken isn't available"""
+    if tiktoken is None:
+        return None
+    try:
+        # o200k_base is the encoding of the gpt-4o / gpt-4.1 model families
+        return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        print(f"Warning: Could not load tokenizer, truncating by characters: {e}")
+        return None
+
+def _find_captures(pattern, content, content_lower):
+    """Run a lowercase pattern over content_lower and return its first group as text from content"""
+    if len(content_lower) != len(content):
+        # A few non-ASCII characters change length when lowercased, so offsets no longer line up;
+        # fall back to a case-insensitive match on the original (re caches the compiled pattern)
+        return re.compile(pattern.pattern, re.IGNORECASE).findall(content)
+    return [content[match.start(1):match.end(1)] for match in pattern.finditer(content_lower)]
 
 class ContentAnalyzer:
     """Class to analyze website content and extract company information using LLMs"""
@@ -18,147 +213,309 @@ class ContentAnalyzer:
         self.model_name = model_name
         self.use_cache = use_cache
         self.cache_expiry = cache_expiry
-        self.company_analysis = {}
+        
+        # Content limits come from the environment; read them once rather than per analysis
+        self.max_content_length = int(os.environ.get('MAX_CONTENT_LENGTH', 2000))
+        self.important_pages_only = os.environ.get('SCRAPE_IMPORTANT_PAGES_ONLY', 'True').lower() == 'true'
+        # Default number of LLM requests analyze_companies keeps in flight
+        self.max_concurrency = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+        # Optional exact token budget for the content in each prompt (needs tiktoken)
+        self.max_content_tokens = int(os.environ.get('MAX_CONTENT_TOKENS', 0))
+        # Send an expired cached analysis as the predicted output when re-analyzing a website
+        self.use_predicted_outputs = os.environ.get('USE_PREDICTED_OUTPUTS', 'False').lower() == 'true'
         
         # Local LLM is disabled, using OpenAI instead
         self.use_local_llm = False
     
     def analyze_company(self, website_data):
         """Analyze website content to extract company information"""
+        cache_key = self._cache_key(website_data)
+        
         # Check cache first if enabled
-        if self.use_cache:
-            cache_key = f"analysis_{website_data['domain']}"
-            cached_data = self._check_cache(cache_key)
-            if cached_data:
-                print(f"Using cached analysis for {website_data['domain']}")
-                return cached_data
+        cached_data = self._cached_analysis(website_data, cache_key)
+        if cached_data:
+            return cached_data
         
         # Prepare content for analysis
         content_to_analyze = self._prepare_content(website_data)
         
+        # The same content may already have been analyzed under another URL
+        content_key = self._content_cache_key(content_to_analyze)
+        cached_data = self._cached_analysis(website_data, content_key)
+        if cached_data:
+            return cached_data
+        
         # Use LLM to analyze content
-        analysis_result = self._analyze_with_llm(content_to_analyze)
+        analysis_result = self._analyze_with_llm(content_to_analyze, self._predicted_analysis(cache_key))
         
-        # Store the analysis for other methods to use
-        self.company_analysis = analysis_result
+        return self._finish_analysis(analysis_result, cache_key, content_key)
+    
+    async def analyze_companies(self, website_data_list, max_concurrency=None, batch_size=1):
+        """Analyze several websites concurrently, keeping at most max_concurrency LLM calls in flight.
+        
+        max_concurrency defaults to the LLM_MAX_CONCURRENCY environment variable (4 if unset).
+        With batch_size > 1, up to batch_size uncached websites share a single LLM request.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        cache_keys = [self._cache_key(website_data) for website_data in website_data_list]
+        results = await asyncio.gather(*[asyncio.to_thread(self._cached_analysis, website_data, cache_key)
+                                         for website_data, cache_key in zip(website_data_list, cache_keys)])
+        
+        # Only websites without a usable cache entry go to the LLM, and each domain only once
+        first_index = {}
+        for i, cached in enumerate(results):
+            if not cached:
+                first_index.setdefault(cache_keys[i], i)
+        contents = {i: self._prepare_content(website_data_list[i]) for i in first_index.values()}
+        
+        # Batch websites of similar length together so a long page doesn't hold up short ones,
+        # and send the longest batches first so they aren't left running at the tail
+        pending = sorted(contents, key=lambda i: len(contents[i]), reverse=True)
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        
+        batch_results = await asyncio.gather(*[
+            self._analyze_batch([website_data_list[i] for i in batch], [contents[i] for i in batch],
+                                [cache_keys[i] for i in batch], semaphore)
+            for batch in batches
+        ])
+        for batch, analyses in zip(batches, batch_results):
+            for i, analysis in zip(batch, analyses):
+                results[i] = analysis
+        
+        # Repeated domains get their own copy of the shared analysis
+        for i, cached in enumerate(results):
+            if not cached:
+                results[i] = dict(results[first_index[cache_keys[i]]])
+        
+        return results
+    
+    def _cache_key(self, website_data):
+        """Cache key under which a website's analysis is stored"""
+        return 'analysis_' + website_data['domain']
+    
+    def _content_cache_key(self, content):
+        """Cache key for prepared content, so identical pages reached via different URLs share an analysis"""
+        # Drop the leading "Website: <url>" line and ignore case and whitespace differences
+        normalized = ' '.join(content.split('\n', 1)[-1].lower().split())
+        return 'analysis_content_' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    
+    def _cached_analysis(self, website_data, cache_key):
+        """Return the cached analysis for a website, or None if caching is off or the entry is missing"""
+        if not self.use_cache:
+            return None
+        
+        cached_data = self._check_cache(cache_key)
+        if cached_data:
+            print(f"Using cached analysis for {website_data['domain']}")
+        return cached_data
+    
+    async def _analyze_batch(self, website_data_batch, contents, cache_keys, semaphore):
+        """Analyze a group of websites (and their prepared contents) with one LLM request, or a plain request for a single site"""
+        content_keys = [self._content_cache_key(content) for content in contents]
+        
+        # Websites whose content was already analyzed under another URL skip the LLM
+        results = await asyncio.gather(*[asyncio.to_thread(self._cached_analysis, website_data, content_key)
+                                         for website_data, content_key in zip(website_data_batch, content_keys)])
+        pending = [i for i, cached in enumerate(results) if not cached]
+        if not pending:
+            return results
+        
+        # Only the LLM round-trip is rate limited; cache IO runs outside the semaphore
+        async with semaphore:
+            if len(pending) == 1:
+                analyses = [await self._aanalyze_with_openai(contents[pending[0]])]
+            else:
+                analyses = await self._analyze_batch_with_openai([contents[i] for i in pending])
         
-        # Add timestamp for cache management
+        # A failed batch is retried one site per request, each taking its own semaphore slot
+        if analyses is None:
+            analyses = await self._aanalyze_each_with_openai([contents[i] for i in pending], semaphore)
+        
+        for i, analysis in zip(pending, analyses):
+            results[i] = await asyncio.to_thread(self._finish_analysis, analysis, cache_keys[i], content_keys[i])
+        return results
+    
+    def _finish_analysis(self, analysis_result, *cache_keys):
+        """Timestamp and cache a fresh analysis result under each of the given keys"""
+        # Add timestamp for consumers; cache expiry uses the store's own write time
         analysis_result['timestamp'] = datetime.now().isoformat()
         
         # Cache the results if enabled
         if self.use_cache:
-            cache_key = f"analysis_{website_data['domain']}"
-            self._cache_results(cache_key, analysis_result)
+            for cache_key in cache_keys:
+                self._cache_results(cache_key, analysis_result)
         
         return analysis_result
     
     def _prepare_content(self, website_data):
         """Prepare website content for LLM analysis"""
-        # Get max content length from environment or use default
-        max_length = int(os.environ.get('MAX_CONTENT_LENGTH', 2000))
-        
-        # Start with basic information (most important)
-        content = f"Website: {website_data['url']}\n"
-        content += f"Company Name: {website_data['name']}\n"
-        content += f"Page Title: {website_data['title']}\n"
-        content += f"Description: {website_data['description']}\n\n"
+        max_length = self.max_content_length
+        
+        # Start with basic information (most important); parts are joined once at the end
+        parts = [
+            f"Website: {website_data['url']}\n",
+            f"Company Name: {website_data['name']}\n",
+            f"Page Title: {website_data['title']}\n",
+            f"Description: {website_data['description']}\n\n"
+        ]
         
         # Extract the most important content first - the description and about page
         about_content = ""
         if 'about' in website_data.get('important_pages', {}):
             about_page = website_data['important_pages']['about']
             if 'content' in about_page and 'error' not in about_page:
-                about_content = about_page['content']
                 # Only use first 1000 chars of about page
-                if len(about_content) > 1000:
-                    about_content = about_content[:1000]
+                about_content = about_page['content'][:1000]
         
         # Add main content (heavily truncated to save tokens)
         main_content = website_data['main_content']
         # Only use first part of main content if we have about content
         main_length = max_length - len(about_content)
         if main_length > 0:
-            if len(main_content) > main_length:
-                content += f"Main Content (truncated): {main_content[:main_length]}...\n\n"
-            else:
-                content += f"Main Content: {main_content}\n\n"
+            # Slice unconditionally (a no-op when the content fits) and only pick the label and suffix
+            truncated = len(main_content) > main_length
+            label, suffix = ("Main Content (truncated)", "...") if truncated else ("Main Content", "")
+            parts.append(f"{label}: {main_content[:main_length]}{suffix}\n\n")
         
         # Add about page content if available
         if about_content:
-            content += f"About Page Content: {about_content}\n\n"
+            parts.append(f"About Page Content: {about_content}\n\n")
             
         # Skip other pages if SCRAPE_IMPORTANT_PAGES_ONLY is True
-        if os.environ.get('SCRAPE_IMPORTANT_PAGES_ONLY', 'True').lower() != 'true':
+        if not self.important_pages_only:
             # Add other important pages content (limited)
             for page_type, page_data in website_data.get('important_pages', {}).items():
                 # Skip about page as we've already added it
                 if page_type == 'about' or 'error' in page_data or 'content' not in page_data:
                     continue
                 
+                # Limit to 500 chars per page
                 page_content = page_data['content']
-                if len(page_content) > 500:  # Limit to 500 chars per page
-                    page_content = page_content[:500] + "..."
-                
-                content += f"{page_type.title()} Page Content: {page_content}\n\n"
+                suffix = "..." if len(page_content) > 500 else ""
+                parts.append(f"{page_type.title()} Page Content: {page_content[:500]}{suffix}\n\n")
+        
+        return ''.join(parts)
+    
+    def _predicted_analysis(self, cache_key):
+        """Expired cached analysis for a website as JSON text, used as the predicted LLM output (or None)"""
+        if not (self.use_cache and self.use_predicted_outputs):
+            return None
+        
+        try:
+            stale_data = get_cache_store().get(cache_key, float('inf'))
+        except Exception as e:
+            print(f"Error reading cache: {str(e)}")
+            return None
+        if not stale_data:
+            return None
         
-        return content
+        stale_data.pop('timestamp', None)
+        return json.dumps(stale_data, indent=2)
     
-    def _analyze_with_llm(self, content):
+    def _analyze_with_llm(self, content, prediction=None):
         """Use LLM to analyze website content"""
-        return self._analyze_with_openai(content)
+        return self._analyze_with_openai(content, prediction)
     
-    def _analyze_with_openai(self, content):
+    def _analyze_with_openai(self, content, prediction=None):
         """Use OpenAI for content analysis"""
         try:
-            # Prepare the prompt for company analysis
-            prompt = f"""
-            You are a business analyst expert. Analyze the following website content and extract key information about the company.
-            
-            IMPORTANT: Focus especially on identifying SPECIFIC offerings/products/services and the target market.
-            
-            Return the results in JSON format with the following fields:
-            - company_name: The name of the company
-            - industry: The specific industry or sector the company operates in (be detailed, not general)
-            - company_size: Estimated company size (small, medium, large)
-            - target_market: Who the company sells to (B2B, B2C, or both) - BE SPECIFIC about the types of customers
-            - offerings: List of SPECIFIC products or services the company offers (at least 3-5 items if possible)
-            - company_description: A brief description of what the company does
-            - location: Company headquarters location if mentioned
-            - founded_year: When the company was founded if mentioned
-            - key_people: Key executives or team members if mentioned
-            - contact_info: Contact information if available
-            - social_media: Social media links if available
-            
-            IMPORTANT GUIDELINES:
-            1. For offerings: List SPECIFIC named products/services, not general categories
-            2. For target_market: Be specific about the types of customers (e.g., "Enterprise healthcare providers" not just "B2B")
-            3. NEVER use "Unknown - LLM analysis required" - make your best inference based on the content
-            4. If information isn't explicitly stated, make reasonable inferences based on the content
-            
-            Website Content:
-            {content[:2000]}  # Limit content to avoid token limits
-            
-            Return ONLY valid JSON without any additional text or explanation.
-            """
+            prompt = self._build_analysis_prompt(content)
             
             # Call OpenAI with the prompt
-            response_text = query_llm(prompt, model=self.model_name)
+            response_text = query_llm(prompt, model=self.model_name, stop_at_json_end=True, json_mode=True, prediction=prediction)
             
-            # Parse the JSON response
-            try:
-                result = extract_json_from_response(response_text)
-                return self._process_llm_response(result)
-            except json.JSONDecodeError:
-                print("Failed to parse LLM response as JSON")
-                return self._analyze_without_llm(content)
+            return self._parse_analysis_response(response_text, content)
                 
         except Exception as e:
             print(f"Error using OpenAI: {str(e)}")
             # Fall back to rule-based analysis
             return self._analyze_without_llm(content)
     
-    def _process_llm_response(self, response):
-        """Process the LLM response and ensure all required fields are present"""
+    async def _aanalyze_with_openai(self, content):
+        """Async variant of _analyze_with_openai for concurrent batch analysis"""
+        try:
+            prompt = self._build_analysis_prompt(content)
+            response_text = await aquery_llm(prompt, model=self.model_name, stop_at_json_end=True, json_mode=True)
+            return self._parse_analysis_response(response_text, content)
+        except Exception as e:
+            print(f"Error using OpenAI: {str(e)}")
+            return self._analyze_without_llm(content)
+    
+    async def _analyze_batch_with_openai(self, contents):
+        """Analyze several websites in a single OpenAI request that returns a {"results": [...]} JSON object, or None if it fails"""
+        try:
+            prompt = self._build_batch_analysis_prompt(contents)
+            # Each website needs its own share of the completion budget
+            response_text = await aquery_llm(prompt, model=self.model_name, max_tokens=1000 * len(contents), stop_at_json_end=True, json_mode=True)
+            results = extract_json_from_response(response_text)
+            if isinstance(results, dict):
+                results = results.get('results')
+            
+            if isinstance(results, list) and len(results) == len(contents) and all(isinstance(r, dict) for r in results):
+                return [self._process_llm_response(result, content) for result, content in zip(results, contents)]
+            
+            print("Batch LLM response did not match the number of websites, analyzing individually")
+        except Exception as e:
+            print(f"Error using OpenAI for batch analysis: {str(e)}")
+        
+        return None
+    
+    async def _aanalyze_each_with_openai(self, contents, semaphore):
+        """Analyze several websites with one concurrent OpenAI request each, every request holding a semaphore slot"""
+        try:
+            prompts = [self._build_analysis_prompt(content) for content in contents]
+            response_texts = await query_many(prompts, semaphore=semaphore, model=self.model_name, stop_at_json_end=True, json_mode=True)
+        except Exception as e:
+            print(f"Error using OpenAI: {str(e)}")
+            return [self._analyze_without_llm(content) for content in contents]
+        
+        analyses = []
+        for response_text, content in zip(response_texts, contents):
+            try:
+                analyses.append(self._parse_analysis_response(response_text, content))
+            except Exception as e:
+                print(f"Error using OpenAI: {str(e)}")
+                analyses.append(self._analyze_without_llm(content))
+        return analyses
+    
+    def _truncate_for_prompt(self, content):
+        """Cut website content down to the prompt budget: MAX_CONTENT_TOKENS tokens if set, else 2000 characters"""
+        encoding = _get_token_encoding() if self.max_content_tokens else None
+        if encoding is None:
+            return content[:2000]
+        
+        tokens = encoding.encode(content)
+        if len(tokens) <= self.max_content_tokens:
+            return content
+        return encoding.decode(tokens[:self.max_content_tokens])
+    
+    def _build_analysis_prompt(self, content):
+        """Build the company analysis prompt for the given website content"""
+        # Only the content slot changes between calls
+        return _PROMPT_HEAD + self._truncate_for_prompt(content) + _PROMPT_TAIL
+    
+    def _build_batch_analysis_prompt(self, contents):
+        """Build one prompt asking for an analysis of each website, returned as {"results": [...]}"""
+        websites = "\n\n".join(f"Website {i}:\n{self._truncate_for_prompt(content)}" for i, content in enumerate(contents, 1))
+        
+        return _BATCH_PROMPT_HEAD + f"""There are exactly {len(contents)} websites, so return exactly {len(contents)} objects.
+        
+        {websites}
+        
+        Return ONLY the JSON object without any additional text or explanation.
+        """
+    
+    def _parse_analysis_response(self, response_text, content):
+        """Parse the LLM response, falling back to rule-based analysis if it isn't JSON"""
+        return self._process_llm_response(extract_json_from_response(response_text), content)
+    
+    def _process_llm_response(self, response, content):
+        """Process the parsed LLM response and ensure all required fields are present"""
+        # Anything other than a JSON object can't be completed, so analyze the content without the LLM
+        if not isinstance(response, dict):
+            print("Failed to parse LLM response as JSON")
+            return self._analyze_without_llm(content)
+        
         # Define required fields with default values
         required_fields = {
             'company_type': 'Unknown',
@@ -182,102 +539,100 @@ class ContentAnalyzer:
     
     def _analyze_without_llm(self, content):
         """Simple rule-based analysis as fallback"""
+        # Scan for every indicator once, then derive each field from the results
+        content_lower = content.lower()
+        counts, words = self._scan_all(content_lower)
+        
+        # Size and target market match case-insensitively on the original text. A few non-ASCII characters
+        # grow when lowercased and add word boundaries, so then those terms are rechecked on the original
+        size_text = content_lower
+        market_words = words
+        if len(content_lower) != len(content):
+            size_text = content
+            market_words = self._find_words_ignorecase(content)
+        
         # Create a basic analysis using rule-based methods
         analysis = {
-            'company_type': self._guess_company_type(content),
-            'industry': self._guess_industry(content),
-            'company_size': self._guess_company_size(content),
-            'target_market': self._guess_target_market(content),
-            'offerings': self._extract_offerings(content),
-            'pain_points': self._guess_pain_points(content)
+            'company_type': self._guess_company_type(counts),
+            'industry': self._guess_industry(words),
+            'company_size': self._guess_company_size(size_text, market_words),
+            'target_market': self._guess_target_market(market_words)
         }
+        # Offerings fall back to the industry and company type detected above
+        analysis['offerings'] = self._extract_offerings(content, content_lower, analysis)
+        analysis['pain_points'] = self._guess_pain_points(content, content_lower)
         
         return analysis
     
-    def _guess_company_type(self, content):
-        """Simple rule-based company type detection"""
-        content = content.lower()
+    def _scan_all(self, content):
+        """Scan lowercased content once for every indicator.
         
-        # Look for B2B indicators
-        b2b_indicators = ['business', 'enterprise', 'organization', 'company', 'client', 'solution']
-        b2b_count = sum(content.count(indicator) for indicator in b2b_indicators)
+        Returns (counts, words): substring counts of the company type indicators, and the set of
+        indicator terms that appear as whole words (what a \\bterm\\b regex would match).
+        """
+        if _INDICATOR_AUTOMATON is not None:
+            return self._scan_all_with_automaton(content)
         
-        # Look for B2C indicators
-        b2c_indicators = ['consumer', 'customer', 'individual', 'personal', 'user', 'people']
-        b2c_count = sum(content.count(indicator) for indicator in b2c_indicators)
+        counts = {indicator: content.count(indicator) for indicator in _COMPANY_TYPE_TERMS}
         
-        # Look for government indicators
-        gov_indicators = ['government', 'public sector', 'agency', 'federal', 'state', 'municipal']
-        gov_count = sum(content.count(indicator) for indicator in gov_indicators)
-        
-        # Look for non-profit indicators
-        npo_indicators = ['non-profit', 'nonprofit', 'charity', 'foundation', 'community', 'donation']
-        npo_count = sum(content.count(indicator) for indicator in npo_indicators)
+        # One tokenizing pass answers every single-word lookup with a set membership test
+        words = _WORD_INDICATOR_TERMS.intersection(_WORD_RE.findall(content))
+        words.update(_COMPOUND_INDICATOR_RE.findall(content))
         
+        return counts, words
+    
+    def _find_words_ignorecase(self, content):
+        """The size and target market terms that appear as whole words in content, ignoring case"""
+        return {term for term in _SIZE_MARKET_TERMS
+                if re.search(r'\b' + re.escape(term) + r'\b', content, re.IGNORECASE)}
+    
+    def _scan_all_with_automaton(self, content):
+        """_scan_all in one Aho-Corasick pass; returns the same (counts, words)"""
+        counts = dict.fromkeys(_COMPANY_TYPE_TERMS, 0)
+        words = set()
+        last = len(content) - 1
+        
+        for end, term in _INDICATOR_AUTOMATON.iter(content):
+            # No company type indicator overlaps itself, so every hit is one str.count occurrence
+            if term in counts:
+                counts[term] += 1
+            
+            # Word terms only count when they aren't part of a longer word (like \bterm\b)
+            if term in _WORD_INDICATOR_TERMS:
+                start = end - len(term) + 1
+                if ((start == 0 or not _WORD_CHAR_RE.match(content, start - 1))
+                        and (end == last or not _WORD_CHAR_RE.match(content, end + 1))):
+                    words.add(term)
+        
+        return counts, words
+    
+    def _guess_company_type(self, counts):
+        """Simple rule-based company type detection"""
         # Determine the most likely type
-        counts = {
-            'B2B': b2b_count,
-            'B2C': b2c_count,
-            'Government': gov_count,
-            'Non-profit': npo_count
+        type_counts = {
+            company_type: sum(counts[indicator] for indicator in indicators)
+            for company_type, indicators in _COMPANY_TYPE_INDICATORS.items()
         }
         
         # Return the type with the highest count, or Unknown if all are 0
-        max_type = max(counts.items(), key=lambda x: x[1])
+        max_type = max(type_counts.items(), key=lambda x: x[1])
         return max_type[0] if max_type[1] > 0 else "Unknown"
     
-    def _guess_industry(self, content):
+    def _guess_industry(self, words):
         """Simple rule-based industry detection"""
-        content = content.lower()
-        
-        industry_patterns = {
-            'Technology': [r'\b(tech|software|it|computing|digital|ai|artificial intelligence)\b'],
-            'Healthcare': [r'\b(health|medical|hospital|pharma|doctor|patient|clinic)\b'],
-            'Finance': [r'\b(finance|bank|investment|insurance|loan|mortgage|financial)\b'],
-            'Education': [r'\b(education|school|university|college|learning|student|teacher)\b'],
-            'Manufacturing': [r'\b(manufacturing|factory|production|industrial|machinery)\b'],
-            'Retail': [r'\b(retail|shop|store|ecommerce|product|consumer)\b'],
-            'Consulting': [r'\b(consulting|consultant|advisor|professional service)\b']
-        }
-        
-        for industry, patterns in industry_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, content):
-                    return industry
-        
-        return "Unknown"
+        # The first industry (in priority order) with any indicator word present wins
+        ranks = [_INDUSTRY_RANK_BY_TERM[word] for word in words if word in _INDUSTRY_RANK_BY_TERM]
+        return _INDUSTRY_NAMES[min(ranks)] if ranks else "Unknown"
     
-    def _extract_offerings(self, content):
+    def _extract_offerings(self, content, content_lower, analysis):
         """Extract the company's offerings (products/services) with improved detection"""
         if not content:
             return ["Unknown - LLM analysis required"]
         
-        # Enhanced prompt for better offerings detection
-        offerings_prompt = (
-            "Analyze the following website content and identify the specific products or services offered by this company. "
-            "Focus on finding concrete offerings rather than general capabilities. "
-            "Look for sections like 'Products', 'Services', 'Solutions', or 'What We Offer'. "
-            "Return a comma-separated list of 3-6 specific offerings (e.g., 'Cloud Storage, AI Consulting, Data Analytics'). "
-            "Be as specific as possible with each offering. "
-            "If you can't determine the offerings with confidence, respond with 'Unknown':\n\n"
-            f"{content[:4000]}"
-        )
-        
+        # Offerings from the LLM come back with the main analysis (see _analyze_with_openai), so this
+        # rule-based path only needs pattern matching
         try:
-            if self.use_local_llm:
-                offerings_text = query_llm(offerings_prompt, model=self.model_name)
-                if isinstance(offerings_text, dict) and 'offerings' in offerings_text:
-                    offerings = offerings_text['offerings']
-                    if isinstance(offerings, list):
-                        return offerings
-                    elif isinstance(offerings, str):
-                        return [item.strip() for item in offerings.split(',') if item.strip()]
-                    
-                # Fallback to pattern matching
-                offerings_text = self._extract_offerings_with_patterns(content)
-            else:
-                # Fallback to pattern matching if LLM is not available
-                offerings_text = self._extract_offerings_with_patterns(content)
+            offerings_text = self._extract_offerings_with_patterns(content, content_lower)
             
             if offerings_text and offerings_text.lower() != "unknown":
                 # Split by commas and clean up
@@ -291,90 +646,57 @@ class ContentAnalyzer:
                         continue
                     filtered_offerings.append(offering)
                 
-                return filtered_offerings if filtered_offerings else self._infer_offerings_from_industry()
+                return filtered_offerings if filtered_offerings else self._infer_offerings_from_industry(analysis)
             else:
-                return self._infer_offerings_from_industry()
+                return self._infer_offerings_from_industry(analysis)
         except Exception as e:
             print(f"Error extracting offerings: {e}")
-            return self._infer_offerings_from_industry()
+            return self._infer_offerings_from_industry(analysis)
     
-    def _extract_offerings_with_patterns(self, content):
+    def _extract_offerings_with_patterns(self, content, content_lower):
         """Extract offerings using pattern matching as a fallback method"""
         # Look for common patterns that indicate offerings
         offerings = []
         
         # Pattern 1: Look for bullet points after headings like "Our Services"
-        service_sections = re.findall(r'(?:Our|Key|Main)\s+(?:Services|Products|Solutions|Offerings)(?:[:\s]*)([^#]+?)(?:\n\n|$)', content, re.IGNORECASE)
+        service_sections = _find_captures(_SERVICE_SECTION_RE, content, content_lower)
         for section in service_sections:
             # Look for bullet points or numbered lists
-            items = re.findall(r'(?:•|\*|\-|\d+\.)\s*([^\n•\*\-\d]+)', section)
+            items = _LIST_ITEM_RE.findall(section)
             if items:
                 offerings.extend([item.strip() for item in items if len(item.strip()) > 3][:6])  # Limit to 6 items
         
         # Pattern 2: Look for "We provide" or "We offer" statements
-        offer_statements = re.findall(r'(?:We|Our company)\s+(?:provide|offer|deliver|specialize in)\s+([^.]+)', content, re.IGNORECASE)
+        offer_statements = _find_captures(_OFFER_STATEMENT_RE, content, content_lower)
         for statement in offer_statements:
             # Split by "and" or commas
-            parts = re.split(r'\s+and\s+|,\s*', statement)
+            parts = _STATEMENT_SPLIT_RE.split(statement)
             offerings.extend([part.strip() for part in parts if len(part.strip()) > 3][:6])  # Limit to 6 items
         
-        # Deduplicate and limit
-        unique_offerings = list(dict.fromkeys([o for o in offerings if o]))
+        # Deduplicate (keeping first-seen order) and limit
+        seen = set()
+        unique_offerings = [o for o in offerings if o and not (o in seen or seen.add(o))]
         
         if unique_offerings:
             return ", ".join(unique_offerings[:6])  # Return top 6 offerings
         else:
             return "Unknown"
     
-    def _infer_offerings_from_industry(self):
+    def _infer_offerings_from_industry(self, analysis):
         """Infer potential offerings based on detected industry and company type"""
-        industry = self.company_analysis.get('industry', 'Unknown')
-        company_type = self.company_analysis.get('company_type', 'B2B')
-        
-        industry_offerings = {
-            'Technology': ['Software Development', 'IT Consulting', 'Cloud Services', 'Data Analytics', 'Cybersecurity'],
-            'Healthcare': ['Medical Services', 'Healthcare IT', 'Patient Management', 'Medical Equipment', 'Telehealth'],
-            'Finance': ['Financial Services', 'Investment Management', 'Banking Solutions', 'Insurance', 'Payment Processing'],
-            'Education': ['Educational Content', 'Learning Management', 'Student Services', 'Educational Technology', 'Training Programs'],
-            'Manufacturing': ['Production Services', 'Supply Chain Management', 'Quality Control', 'Equipment Manufacturing', 'Industrial Design'],
-            'Retail': ['E-commerce Solutions', 'Inventory Management', 'Customer Experience', 'Point of Sale Systems', 'Retail Analytics'],
-            'Consulting': ['Business Strategy', 'Management Consulting', 'Process Improvement', 'Change Management', 'Industry Expertise']
-        }
-        
-        if industry in industry_offerings:
-            # Return the top 3 most relevant offerings for this industry
-            return industry_offerings[industry][:3]
-        else:
-            # Generic offerings based on company type
-            if company_type == 'B2B':
-                return ['Business Services', 'Professional Solutions', 'Enterprise Software']
-            elif company_type == 'B2C':
-                return ['Consumer Products', 'Customer Services', 'Retail Solutions']
-            else:
-                return ['Professional Services', 'Industry Solutions', 'Specialized Expertise']
-    
-    def _guess_company_size(self, content):
-        """Guess the company size from content"""
-        # Look for employee count indicators
-        small_indicators = ['small', 'startup', 'founder', 'small business']
-        medium_indicators = ['growing', 'mid-size', 'medium']
-        large_indicators = ['enterprise', 'corporation', 'global', 'nationwide', 'international']
-        
-        # Check for size indicators
-        for indicator in large_indicators:
-            if re.search(r'\b' + indicator + r'\b', content, re.I):
-                return "Large"
-                
-        for indicator in medium_indicators:
-            if re.search(r'\b' + indicator + r'\b', content, re.I):
-                return "Medium"
-                
-        for indicator in small_indicators:
-            if re.search(r'\b' + indicator + r'\b', content, re.I):
-                return "Small"
+        industry = analysis.get('industry', 'Unknown')
+        company_type = analysis.get('company_type', 'B2B')
+        return list(_infer_offerings(industry, company_type))
+    
+    def _guess_company_size(self, content, words):
+        """Guess the company size from the content (lowercased, or the original text)"""
+        # Check for size indicators, largest first
+        for size, indicators in _SIZE_INDICATORS:
+            if not words.isdisjoint(indicators):
+                return size
         
         # Look for team/employee mentions
-        team_match = re.search(r'team of (\d+)', content, re.I)
+        team_match = _TEAM_SIZE_RE.search(content)
         if team_match:
             count = int(team_match.group(1))
             if count < 50:
@@ -386,100 +708,85 @@ class ContentAnalyzer:
         
         return "Medium"  # Default to Medium if unknown
     
-    def _guess_target_market(self, content):
-        """Guess the target market from content"""
+    def _guess_target_market(self, words):
+        """Guess the target market from the indicator words found in the content"""
         target_markets = []
         
-        # Look for common target market indicators
-        b2b_indicators = ['enterprise', 'business', 'companies', 'organizations', 'firms']
-        b2c_indicators = ['consumer', 'individual', 'personal', 'people', 'family']
-        industry_indicators = ['healthcare', 'finance', 'retail', 'education', 'manufacturing', 'technology']
-        
         # Check for B2B/B2C indicators
-        for indicator in b2b_indicators:
-            if re.search(r'\b' + indicator + r'\b', content, re.I):
-                target_markets.append('B2B Companies')
-                break
+        if not words.isdisjoint(_B2B_MARKET_INDICATORS):
+            target_markets.append('B2B Companies')
                 
-        for indicator in b2c_indicators:
-            if re.search(r'\b' + indicator + r'\b', content, re.I):
-                target_markets.append('Individual Consumers')
-                break
+        if not words.isdisjoint(_B2C_MARKET_INDICATORS):
+            target_markets.append('Individual Consumers')
                 
         # Check for industry-specific indicators
-        for indicator in industry_indicators:
-            if re.search(r'\b' + indicator + r'\b', content, re.I):
+        for indicator in _INDUSTRY_MARKET_INDICATORS:
+            if indicator in words:
                 target_markets.append(f'{indicator.title()} Industry')
         
         # Return results or default
         return target_markets if target_markets else ["Unknown - LLM analysis required"]
     
-    def _guess_pain_points(self, content):
+    def _guess_pain_points(self, content, content_lower):
         """Guess potential pain points from content"""
         pain_points = []
         
-        # Look for common pain point indicators
-        pain_indicators = [
-            'challenge', 'problem', 'struggle', 'difficulty', 'obstacle',
-            'improve', 'optimize', 'streamline', 'enhance', 'simplify',
-            'reduce costs', 'save time', 'increase efficiency'
-        ]
-        
-        for indicator in pain_indicators:
-            pattern = r'(?:' + indicator + r')\s+([^.!?;]+)'
-            matches = re.findall(pattern, content, re.I)
-            for match in matches:
+        for pattern in _PAIN_POINT_PATTERNS:
+            for match in _find_captures(pattern, content, content_lower):
                 if 10 < len(match) < 100:  # Filter out very short or long matches
                     pain_points.append(match.strip())
         
-        # Deduplicate and limit
-        unique_pain_points = list(dict.fromkeys([p for p in pain_points if p]))
+        # Deduplicate (keeping first-seen order) and limit
+        seen = set()
+        unique_pain_points = [p for p in pain_points if p and not (p in seen or seen.add(p))]
         return unique_pain_points[:5] if unique_pain_points else ["Unknown - LLM analysis required"]
     
     def _check_cache(self, cache_key):
         """Check if we have a valid cache for this analysis"""
-        cache_path = get_cache_path(cache_key, subdir='analysis')
-        
-        if not os.path.exists(cache_path):
-            return None
-        
         try:
-            with open(cache_path, 'r') as f:
-                cached_data = json.load(f)
-            
-            # Check if cache is expired
-            timestamp = datetime.fromisoformat(cached_data.get('timestamp', '2000-01-01'))
-            now = datetime.now()
-            
-            if (now - timestamp).total_seconds() > self.cache_expiry:
-                print(f"Cache expired for {cache_key}")
-                return None
-                
-            return cached_data
+            return get_cache_store().get(cache_key, self.cache_expiry)
         except Exception as e:
             print(f"Error reading cache: {str(e)}")
             return None
     
     def _cache_results(self, cache_key, data):
         """Save results to cache"""
-        cache_path = get_cache_path(cache_key, subdir='analysis')
-        
         try:
-            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-            with open(cache_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            get_cache_store().set(cache_key, data)
         except Exception as e:
             print(f"Error writing to cache: {str(e)}")
 
 # Function to be imported by other modules
-def analyze_company(website_data, use_cache=True):
-    """Analyze website data and extract company information"""
-    # Get settings from environment variables or use defaults
+# Analyzers are shared per settings combination instead of being rebuilt for every call
+_analyzers = {}
+_analyzers_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _analyzer_settings():
+    """Read the analyzer settings from environment variables (or defaults) once per process"""
     use_local_llm = os.environ.get('USE_LOCAL_LLM', 'True').lower() == 'true'
     model_name = os.environ.get('OPENAI_MODEL', 'gpt-4.1-nano')
+    return use_local_llm, model_name
+
+def get_analyzer(use_cache=True):
+    """Get the shared ContentAnalyzer for the environment settings"""
+    use_local_llm, model_name = _analyzer_settings()
     
-    analyzer = ContentAnalyzer(use_local_llm=use_local_llm, model_name=model_name, use_cache=use_cache)
-    return analyzer.analyze_company(website_data)
+    key = (use_local_llm, model_name, use_cache)
+    with _analyzers_lock:
+        if key not in _analyzers:
+            _analyzers[key] = ContentAnalyzer(use_local_llm=use_local_llm, model_name=model_name, use_cache=use_cache)
+        return _analyzers[key]
+
+def analyze_company(website_data, use_cache=True):
+    """Analyze website data and extract company information"""
+    return get_analyzer(use_cache).analyze_company(website_data)
+
+def analyze_companies(website_data_list, use_cache=True, max_concurrency=None, batch_size=1):
+    """Analyze several websites concurrently and return results in input order"""
+    analyzer = get_analyzer(use_cache)
+    # Runs on the shared LLM loop, where the async client's pooled connections live
+    return run_async(analyzer.analyze_companies(website_data_list, max_concurrency=max_concurrency, batch_size=batch_size))
 
 # For testing
 if __name__ == "__main__":
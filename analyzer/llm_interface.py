@@ -2,12 +2,30 @@
 Interface for querying LLMs using OpenAI API
 """
 import os
+import re
 import json
-import requests
+import hashlib
 import time
-from openai import OpenAI
+import asyncio
+import sys
+import threading
+import httpx
+from functools import lru_cache
+from openai import OpenAI, AsyncOpenAI, NOT_GIVEN
+try:
+    import h2  # noqa: F401 - only needed so httpx can negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.helpers import json_loads
+from analyzer.cache_store import get_cache_store
+
+# Set once the .env file has been applied; child processes inherit both it and the loaded variables
+ENV_LOADED_SENTINEL = '_LEADGEN_ENV_LOADED'
 
 # Simple function to load environment variables from .env file
+@lru_cache(maxsize=1)
 def load_env_from_file():
     try:
         with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'), 'r') as f:
@@ -16,27 +34,146 @@ def load_env_from_file():
                 if line and not line.startswith('#') and '=' in line:
                     key, value = line.split('=', 1)
                     os.environ[key] = value
+        os.environ[ENV_LOADED_SENTINEL] = '1'
     except Exception as e:
         print(f"Warning: Could not load .env file: {e}")
 
 # Try to load environment variables from .env file if not already set
-if 'OPENAI_API_KEY' not in os.environ:
+if 'OPENAI_API_KEY' not in os.environ and os.environ.get(ENV_LOADED_SENTINEL) != '1':
     load_env_from_file()
 
 # Get LLM configuration from environment variables
 USE_LOCAL_LLM = os.getenv('USE_LOCAL_LLM', 'False').lower() == 'true'
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4.1-nano')
+# Optional response cache for identical requests (LLM_PROMPT_CACHE=1), stored in the shared cache store
+PROMPT_CACHE_ENABLED = os.getenv('LLM_PROMPT_CACHE', '0') == '1'
+PROMPT_CACHE_EXPIRY = int(os.getenv('LLM_PROMPT_CACHE_EXPIRY', 86400))
+
+SYSTEM_PROMPT = "You are a helpful assistant that provides concise, accurate information."
+# Structured output mode: the model is constrained to emit one valid JSON object
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# Connection pool shared by every concurrent async request; multiplexed over HTTP/2 when h2 is installed
+ASYNC_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+# Keep-alive pool for the sync client so consecutive calls reuse the same TLS connection
+SYNC_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+HTTP_TIMEOUT = 60
 
-# Initialize OpenAI client
+# Initialize OpenAI clients (sync for the request path, async for batch analysis).
+# The async client's pooled connections belong to the event loop that opened them, so every
+# coroutine using it must run on the shared loop through run_async.
 client = None
+async_client = None
 if OPENAI_API_KEY:
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
+        client = OpenAI(
+            api_key=OPENAI_API_KEY,
+            http_client=httpx.Client(http2=HTTP2_AVAILABLE, limits=SYNC_HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        )
+        async_client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            http_client=httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=ASYNC_HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        )
     except Exception as e:
         print(f"Warning: Failed to initialize OpenAI client: {e}")
 
-def query_llm(prompt, model=None, temperature=0.7, max_retries=3, retry_delay=2):
+def warm_up():
+    """
+    Open the sync client's connection ahead of the first real request
+    
+    Hosted models have no load delay, so the only cold-start cost is the TCP/TLS handshake;
+    a model lookup establishes the pooled connection that query_llm then reuses.
+    """
+    if client is None:
+        return
+    
+    try:
+        client.models.retrieve(OPENAI_MODEL)
+        print("[DEBUG] OpenAI connection warmed up")
+    except Exception as e:
+        print(f"Warning: OpenAI warm-up failed: {e}")
+
+# One long-lived event loop, on a daemon thread, runs all async LLM work
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    """Start the shared event loop thread on first use and return its loop"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='llm-event-loop', daemon=True).start()
+            _loop = loop
+        return _loop
+
+def run_async(coro):
+    """
+    Run a coroutine on the shared LLM event loop and wait for its result
+    
+    Safe to call from any number of threads at once; it must not be called from the loop itself.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+class JsonEndTracker:
+    """Follows streamed text and reports when the first top-level JSON object or array closes"""
+    
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text):
+        """Consume the next piece of text; returns True once the JSON value is complete"""
+        for char in text:
+            if not self.started:
+                # Skip any preamble (e.g. a ```json fence) before the value starts
+                if char in '{[':
+                    self.started = True
+                    self.depth = 1
+                continue
+            
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        
+        return False
+
+def _prompt_cache_key(prompt, model_name, temperature, max_tokens, stop_at_json_end, json_mode):
+    """Cache key for a request: a hash of the prompt and every option that changes the response"""
+    request_text = f"{model_name}|{temperature}|{max_tokens}|{stop_at_json_end}|{json_mode}|{prompt}"
+    return 'prompt_' + hashlib.sha1(request_text.encode('utf-8')).hexdigest()
+
+def _cached_response(cache_key):
+    """Return the cached response text for a request, or None"""
+    try:
+        return get_cache_store().get(cache_key, PROMPT_CACHE_EXPIRY)
+    except Exception as e:
+        print(f"Error reading prompt cache: {str(e)}")
+        return None
+
+def _cache_response(cache_key, response_text):
+    """Save a response text under its request key"""
+    try:
+        get_cache_store().set(cache_key, response_text)
+    except Exception as e:
+        print(f"Error writing prompt cache: {str(e)}")
+
+def query_llm(prompt, model=None, temperature=0.7, max_retries=3, retry_delay=2, max_tokens=1000, stop_at_json_end=False, json_mode=False, prediction=None):
     """
     Query LLM with the given prompt
     
@@ -46,6 +183,13 @@ def query_llm(prompt, model=None, temperature=0.7, max_retries=3, retry_delay=2)
         temperature (float, optional): Sampling temperature. Defaults to 0.7.
         max_retries (int, optional): Maximum number of retries. Defaults to 3.
         retry_delay (int, optional): Delay between retries in seconds. Defaults to 2.
+        max_tokens (int, optional): Maximum tokens to generate. Defaults to 1000.
+        stop_at_json_end (bool, optional): Stream the response and stop reading once the first
+            JSON object/array is complete, so trailing text isn't waited for. Defaults to False.
+        json_mode (bool, optional): Ask the API to return a single valid JSON object
+            (response_format json_object); the prompt must mention JSON. Defaults to False.
+        prediction (str, optional): Text the response is expected to largely repeat (Predicted
+            Outputs); matching tokens are accepted without being decoded one by one. Defaults to None.
         
     Returns:
         str: The LLM response text
@@ -64,6 +208,14 @@ def query_llm(prompt, model=None, temperature=0.7, max_retries=3, retry_delay=2)
         print("OpenAI client is not initialized. Using fallback methods.")
         return "OpenAI client is not initialized"
     
+    cache_key = None
+    if PROMPT_CACHE_ENABLED:
+        cache_key = _prompt_cache_key(prompt, model_name, temperature, max_tokens, stop_at_json_end, json_mode)
+        cached_text = _cached_response(cache_key)
+        if cached_text is not None:
+            print("[DEBUG] Using cached response for identical prompt")
+            return cached_text
+    
     # Try to query the LLM with retries
     for attempt in range(max_retries):
         try:
@@ -72,15 +224,39 @@ def query_llm(prompt, model=None, temperature=0.7, max_retries=3, retry_delay=2)
             response = client.chat.completions.create(
                 model=model_name,
                 messages=[
-                    {"role": "system", "content": "You are a helpful assistant that provides concise, accurate information."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=temperature,
-                max_tokens=1000
+                max_tokens=max_tokens,
+                stream=stop_at_json_end,
+                response_format=JSON_RESPONSE_FORMAT if json_mode else NOT_GIVEN,
+                prediction={"type": "content", "content": prediction} if prediction else NOT_GIVEN
             )
             
+            if stop_at_json_end:
+                # Collect deltas until the JSON value closes, then drop the rest of the stream
+                parts = []
+                tracker = JsonEndTracker()
+                try:
+                    for chunk in response:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            parts.append(delta)
+                            if tracker.feed(delta):
+                                break
+                finally:
+                    response.close()
+                response_text = ''.join(parts)
+            else:
+                response_text = response.choices[0].message.content
+            
             print(f"[DEBUG] Successfully received response from OpenAI")
-            return response.choices[0].message.content
+            if cache_key:
+                _cache_response(cache_key, response_text)
+            return response_text
             
         except Exception as e:
             print(f"[DEBUG] Exception querying OpenAI (Attempt {attempt+1}/{max_retries}): {str(e)}")
@@ -92,6 +268,113 @@ def query_llm(prompt, model=None, temperature=0.7, max_retries=3, retry_delay=2)
     return "Failed to get response from LLM"
 
 
+async def aquery_llm(prompt, model=None, temperature=0.7, max_retries=3, retry_delay=2, max_tokens=1000, stop_at_json_end=False, json_mode=False):
+    """
+    Async variant of query_llm so several prompts can be in flight at once
+    
+    Args:
+        prompt (str): The prompt to send to the LLM
+        model (str, optional): The model to use. Defaults to the OPENAI_MODEL env var.
+        temperature (float, optional): Sampling temperature. Defaults to 0.7.
+        max_retries (int, optional): Maximum number of retries. Defaults to 3.
+        retry_delay (int, optional): Delay between retries in seconds. Defaults to 2.
+        max_tokens (int, optional): Maximum tokens to generate. Defaults to 1000.
+        stop_at_json_end (bool, optional): Stream the response and stop reading once the first
+            JSON object/array is complete, so trailing text isn't waited for. Defaults to False.
+        json_mode (bool, optional): Ask the API to return a single valid JSON object
+            (response_format json_object); the prompt must mention JSON. Defaults to False.
+        
+    Returns:
+        str: The LLM response text
+    """
+    model_name = model or OPENAI_MODEL
+    
+    print(f"\n[DEBUG] Async querying OpenAI with model: {model_name}")
+    print(f"[DEBUG] Prompt length: {len(prompt)} characters")
+    
+    if not OPENAI_API_KEY:
+        print("OpenAI API key is not set. Using fallback methods.")
+        return "OpenAI API key is not set"
+    
+    if async_client is None:
+        print("OpenAI client is not initialized. Using fallback methods.")
+        return "OpenAI client is not initialized"
+    
+    cache_key = None
+    if PROMPT_CACHE_ENABLED:
+        cache_key = _prompt_cache_key(prompt, model_name, temperature, max_tokens, stop_at_json_end, json_mode)
+        cached_text = await asyncio.to_thread(_cached_response, cache_key)
+        if cached_text is not None:
+            print("[DEBUG] Using cached response for identical prompt")
+            return cached_text
+    
+    for attempt in range(max_retries):
+        try:
+            response = await async_client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=stop_at_json_end,
+                response_format=JSON_RESPONSE_FORMAT if json_mode else NOT_GIVEN
+            )
+            
+            if stop_at_json_end:
+                # Collect deltas until the JSON value closes, then drop the rest of the stream
+                parts = []
+                tracker = JsonEndTracker()
+                try:
+                    async for chunk in response:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            parts.append(delta)
+                            if tracker.feed(delta):
+                                break
+                finally:
+                    await response.close()
+                response_text = ''.join(parts)
+            else:
+                response_text = response.choices[0].message.content
+            
+            if cache_key:
+                await asyncio.to_thread(_cache_response, cache_key, response_text)
+            return response_text
+            
+        except Exception as e:
+            print(f"[DEBUG] Exception querying OpenAI (Attempt {attempt+1}/{max_retries}): {str(e)}")
+            # Sleep without blocking the other in-flight requests
+            await asyncio.sleep(retry_delay)
+    
+    print("[DEBUG] All attempts to query OpenAI failed. Using fallback response.")
+    return "Failed to get response from LLM"
+
+
+async def query_many(prompts, semaphore=None, **kwargs):
+    """
+    Send several prompts concurrently and return their response texts in prompt order
+    
+    Args:
+        prompts (list): The prompts to send to the LLM
+        semaphore (asyncio.Semaphore): Optional limit; each request holds one slot while in flight
+        **kwargs: Options passed through to aquery_llm for every prompt
+        
+    Returns:
+        list: The LLM response texts
+    """
+    async def query_one(prompt):
+        if semaphore is None:
+            return await aquery_llm(prompt, **kwargs)
+        async with semaphore:
+            return await aquery_llm(prompt, **kwargs)
+    
+    return await asyncio.gather(*[query_one(prompt) for prompt in prompts])
+
+
 # Legacy function name for backward compatibility
 def query_ollama(prompt, model=None, temperature=0.7, max_retries=3, retry_delay=2):
     """
@@ -99,6 +382,11 @@ def query_ollama(prompt, model=None, temperature=0.7, max_retries=3, retry_delay
     """
     return query_llm(prompt, model, temperature, max_retries, retry_delay)
 
+# Markdown code fence around a JSON payload, e.g. ```json ... ```
+_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)\s*```', re.DOTALL)
+# raw_decode parses one JSON value from a given offset and stops at its matching close bracket
+_JSON_DECODER = json.JSONDecoder()
+
 def extract_json_from_response(response_text):
     """
     Extract JSON from an LLM response that might contain additional text
@@ -109,30 +397,28 @@ def extract_json_from_response(response_text):
     Returns:
         dict: The extracted JSON object or None if extraction failed
     """
-    try:
-        # Try to parse the entire response as JSON first
-        return json.loads(response_text)
-    except json.JSONDecodeError:
-        # If that fails, try to extract JSON from the response
+    # Try to parse the entire response as JSON first, unless it clearly isn't a bare object/array
+    if response_text.lstrip()[:1] in ('{', '['):
         try:
-            # Look for JSON object in the response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                return json.loads(json_str)
-            
-            # Look for JSON array in the response
-            json_start = response_text.find('[')
-            json_end = response_text.rfind(']') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                return json.loads(json_str)
-            
-        except (json.JSONDecodeError, ValueError):
+            return json_loads(response_text)
+        except json.JSONDecodeError:
             pass
     
+    # Look for a fenced JSON block
+    fence = _FENCE_RE.search(response_text)
+    if fence:
+        try:
+            return json_loads(fence.group(1))
+        except json.JSONDecodeError:
+            pass
+    
+    # Parse the first JSON object or array in the text, ignoring anything after it
+    starts = sorted(pos for pos in (response_text.find('{'), response_text.find('[')) if pos >= 0)
+    for start in starts:
+        try:
+            return _JSON_DECODER.raw_decode(response_text, start)[0]
+        except json.JSONDecodeError:
+            continue
+    
     # If all extraction attempts fail, return None
     return None
@@ -1,17 +1,44 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, make_response
+from flask.json.provider import DefaultJSONProvider
 import os
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-import json
 
 # Import project modules
 from scraper.website_scraper import scrape_website
-from analyzer.content_analyzer import analyze_company
+from analyzer.content_analyzer import analyze_company, analyze_companies
 from lead_finder.lead_generator import generate_leads
-from utils.helpers import clean_url, format_results
+from analyzer.cache_store import get_cache_store
+from analyzer.llm_interface import warm_up
+from utils.helpers import clean_url, format_results, json_dumps, json_loads, read_json, url_to_filename, write_json_atomic
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by the orjson helpers, so jsonify responses skip the stdlib encoder"""
+    
+    def dumps(self, obj, **kwargs):
+        return json_dumps(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return json_loads(s)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev_secret_key')
-app.config['SESSION_TYPE'] = 'filesystem'
+
+# A URL analyzed this recently (in seconds) is answered from the cache store instead of rerunning the pipeline
+RESULTS_CACHE_EXPIRY = int(os.environ.get('RESULTS_CACHE_EXPIRY', 3600))
+
+# Stored results stay readable by /results and /export for this long (in seconds)
+RESULTS_EXPIRY = int(os.environ.get('RESULTS_EXPIRY', 7 * 86400))
+
+# Websites analyzed per LLM request when several URLs are submitted together; above 1, multi-URL
+# requests scrape every website before analyzing them in batches (1 pipelines each URL on its own)
+ANALYZE_BATCH_SIZE = int(os.environ.get('ANALYZE_BATCH_SIZE', 1))
+
+# Shared workers for multi-URL requests and results archiving
+pipeline_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('PIPELINE_WORKERS', 8)))
 
 # Create necessary directories if they don't exist
 os.makedirs('data/results', exist_ok=True)
@@ -27,6 +54,10 @@ def clear_cache():
                 for cache_file in os.listdir(cache_dir):
                     os.remove(os.path.join(cache_dir, cache_file))
                 print(f"Cleared cache in {cache_dir}")
+        
+        # Analysis, scrape, lead and /analyze results live in the SQLite cache store
+        get_cache_store().clear()
+        print("Cleared cache store")
     except Exception as e:
         print(f"Error clearing cache: {e}")
 
@@ -34,84 +65,236 @@ def clear_cache():
 if os.environ.get('FLASK_ENV') == 'development' or os.environ.get('FLASK_DEBUG') == '1':
     clear_cache()
 
+# Connect to the LLM API in the background so the first /analyze doesn't pay for the handshake
+if os.environ.get('LLM_WARMUP', 'True').lower() == 'true':
+    threading.Thread(target=warm_up, daemon=True).start()
+
 @app.route('/')
 def index():
     """Render the main page"""
     return render_template('index.html')
 
+def save_results(url, company_analysis, leads):
+    """Store the formatted results for a website and archive them to the results directory; returns the file name"""
+    results = format_results(url, company_analysis, leads)
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = url_to_filename(url, timestamp)
+    
+    # /results and /export read from the cache store, so the archive file is written off the request path
+    try:
+        get_cache_store().set('result_file_' + filename, results)
+    except Exception as e:
+        print(f"Error storing results: {e}")
+        write_results_file(filename, results)
+        return filename
+    
+    pipeline_executor.submit(write_results_file, filename, results)
+    return filename
+
+def write_results_file(filename, results):
+    """Write formatted results to their archive file"""
+    try:
+        # Written in the background, so swap the file into place for load_results to never read it half-written
+        write_json_atomic(filename, results, indent=True)
+    except Exception as e:
+        print(f"Error writing results file: {e}")
+
+def load_results(result_file):
+    """Return the saved results for a file name from the cache store, falling back to the archive file"""
+    try:
+        results = get_cache_store().get('result_file_' + result_file, RESULTS_EXPIRY)
+        if results is not None:
+            return results
+    except Exception as e:
+        print(f"Error reading stored results: {e}")
+    
+    if os.path.exists(result_file):
+        return read_json(result_file)
+    return None
+
+def results_cache_key(url):
+    """Cache store key for the pipeline output of a cleaned URL"""
+    return 'results_' + hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def cached_results(url):
+    """Return the cached pipeline output for a URL, or None"""
+    try:
+        cached = get_cache_store().get(results_cache_key(url), RESULTS_CACHE_EXPIRY)
+    except Exception as e:
+        print(f"Error reading results cache: {e}")
+        return None
+    
+    return cached
+
+# Pipeline runs in progress, keyed by (url, force_refresh); concurrent requests for the same key wait on one run
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def run_pipeline(url, force_refresh):
+    """Scrape, analyze and generate leads for one URL, reusing a recent or in-progress run of the same URL"""
+    if not force_refresh:
+        cached = cached_results(url)
+        if cached:
+            print(f"Using cached results for {url}")
+            return cached
+    
+    key = (url, force_refresh)
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = Future()
+    
+    if not leader:
+        print(f"Waiting for in-progress analysis of {url}")
+        return flight.result()
+    
+    try:
+        output = _run_pipeline_stages(url, force_refresh)
+    except Exception as e:
+        flight.set_exception(e)
+        raise
+    else:
+        flight.set_result(output)
+        return output
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+
+def _run_pipeline_stages(url, force_refresh):
+    """Run every pipeline stage for one URL and cache the output"""
+    # Step 1: Scrape the website (force refresh if requested)
+    website_data = scrape_website(url, use_cache=not force_refresh)
+    
+    # Step 2: Analyze the company (force refresh if requested)
+    company_analysis = analyze_company(website_data, use_cache=not force_refresh)
+    
+    return _finish_pipeline(url, company_analysis, force_refresh)
+
+def _finish_pipeline(url, company_analysis, force_refresh):
+    """Generate leads for an analyzed URL, save the results and cache the output"""
+    # Step 3: Generate leads (force refresh if requested)
+    leads = generate_leads(company_analysis, url, use_cache=not force_refresh)
+    
+    output = {
+        'company': company_analysis,
+        'leads': leads,
+        'result_file': save_results(url, company_analysis, leads)
+    }
+    
+    try:
+        get_cache_store().set(results_cache_key(url), output)
+    except Exception as e:
+        print(f"Error writing results cache: {e}")
+    
+    return output
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    """Process a website URL and generate leads"""
-    url = request.form.get('url', '')
+    """Process a website URL (or several, sent as repeated urls fields) and generate leads"""
+    urls = [url for url in request.form.getlist('urls') if url] or [request.form.get('url', '')]
     force_refresh = request.form.get('force_refresh', 'false').lower() == 'true'
     
-    if not url:
+    if not urls[0]:
         return jsonify({'error': 'No URL provided'}), 400
     
-    # Clean and validate the URL
-    url = clean_url(url)
+    # Clean and validate the URLs
+    urls = [clean_url(url) for url in urls]
     
     try:
         # Set environment variables for testing
         os.environ['USE_LOCAL_LLM'] = 'True'
         os.environ['FIND_EXTERNAL_LEADS'] = 'True'
         
-        # Step 1: Scrape the website (force refresh if requested)
-        website_data = scrape_website(url, use_cache=not force_refresh)
-        
-        # Step 2: Analyze the company (force refresh if requested)
-        company_analysis = analyze_company(website_data, use_cache=not force_refresh)
-        
-        # Step 3: Generate leads (force refresh if requested)
-        leads = generate_leads(company_analysis, url, use_cache=not force_refresh)
-        
-        # Format the results
-        results = format_results(url, company_analysis, leads)
-        
-        # Save results
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"data/results/{url.replace('https://', '').replace('http://', '').split('/')[0]}_{timestamp}.json"
+        if len(urls) > 1:
+            return jsonify({'success': True, 'results': analyze_many(urls, force_refresh)})
         
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+        output = run_pipeline(urls[0], force_refresh)
         
         # Store in session for retrieval
-        session['last_result'] = filename
+        session['last_result'] = output['result_file']
         
-        return jsonify({
-            'success': True,
-            'company': company_analysis,
-            'leads': leads,
-            'result_file': filename
-        })
+        return jsonify({'success': True, **output})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def analyze_many(urls, force_refresh):
+    """Run the pipeline for several URLs, overlapping one URL's stages with another's"""
+    unique_urls = list(dict.fromkeys(urls))
+    
+    if ANALYZE_BATCH_SIZE > 1:
+        outputs = analyze_many_batched(unique_urls, force_refresh)
+    else:
+        # Each URL runs its own pipeline on the shared workers, so one slow website only delays its
+        # own results; run_pipeline also shares in-progress runs with concurrent requests
+        outputs = dict(zip(unique_urls, pipeline_executor.map(run_pipeline, unique_urls, [force_refresh] * len(unique_urls))))
+    
+    # Results follow the order of the submitted URLs
+    results = [{'url': url, **outputs[url]} for url in urls]
+    
+    # The last website's results are the ones shown on the results page
+    session['last_result'] = results[-1]['result_file']
+    
+    return results
+
+def analyze_many_batched(urls, force_refresh):
+    """Scrape the uncached URLs, then analyze them together so up to ANALYZE_BATCH_SIZE websites share an LLM request"""
+    outputs = {}
+    if not force_refresh:
+        for url in urls:
+            cached = cached_results(url)
+            if cached:
+                print(f"Using cached results for {url}")
+                outputs[url] = cached
+    pending = [url for url in urls if url not in outputs]
+    
+    if pending:
+        # Scraping waits on the websites, so the pages are fetched in parallel on the shared workers
+        website_data_list = list(pipeline_executor.map(lambda url: scrape_website(url, use_cache=not force_refresh), pending))
+        
+        # Batches need every website up front; analyze_companies also dedupes repeated content and domains
+        analyses = analyze_companies(website_data_list, use_cache=not force_refresh, batch_size=ANALYZE_BATCH_SIZE)
+        
+        for url, output in zip(pending, pipeline_executor.map(_finish_pipeline, pending, analyses, [force_refresh] * len(pending))):
+            outputs[url] = output
+    
+    return outputs
+
 @app.route('/results')
 def results():
     """View the last analysis results"""
     result_file = session.get('last_result')
     
-    if not result_file or not os.path.exists(result_file):
-        return render_template('results.html', error="No results found")
+    # Results files never change once written, so the file name identifies the page
+    etag = hashlib.sha1(result_file.encode('utf-8')).hexdigest() if result_file else None
+    if etag and etag in request.if_none_match:
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
     
-    with open(result_file, 'r') as f:
-        results = json.load(f)
+    results = load_results(result_file) if result_file else None
     
-    return render_template('results.html', results=results)
+    if results is None:
+        return render_template('results.html', error="No results found")
+    
+    response = make_response(render_template('results.html', results=results))
+    response.set_etag(etag)
+    # /results shows whichever run is last in the session, so browsers must revalidate every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/export/<format>')
 def export_results(format):
     """Export results in various formats"""
     result_file = session.get('last_result')
+    results = load_results(result_file) if result_file else None
     
-    if not result_file or not os.path.exists(result_file):
+    if results is None:
         return jsonify({'error': 'No results found'}), 404
     
-    with open(result_file, 'r') as f:
-        results = json.load(f)
-    
     if format == 'json':
         return jsonify(results)
     elif format == 'csv':
@@ -1,54 +1,327 @@
 import os
 import json
 import re
+import hashlib
 import random
-from datetime import datetime
 import sys
-import requests
-import time
+import threading
+from functools import lru_cache
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.helpers import get_cache_path
+from utils.helpers import json_loads
 from analyzer.llm_interface import query_llm
+from analyzer.cache_store import get_cache_store
+# The analyzer's fallback offerings table is shared so inferred offerings agree across both stages
+from analyzer.content_analyzer import _infer_offerings
+
+# JSON object wrapped in a markdown code fence in an LLM reply
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(\{[\s\S]*?\})\s*```')
+
+# Characters dropped from a lowercased company name to make its domain
+_BAD_CHAR_RE = re.compile(r'[^a-z0-9]')
+
+# Prompt for LLM-generated potential customers; filled in with str.format, so literal braces are doubled
+_MATCHES_PROMPT_TEMPLATE = """
+            You are a lead generation expert. Based on the following company profile, generate 5-7 SPECIFIC potential customer companies that would be interested in their offerings.
+            
+            Company Profile:
+            - Industry: {industry}
+            - Offerings: {offerings_str}
+            - Target Market: {target_market_str}
+            - Company Size: {company_size}
+            - Description: {company_description}
+            
+            For each potential customer, provide:
+            1. Company Name (use REAL company names, not generic ones like 'Tech Solutions Inc')
+            2. Industry they operate in (be specific)
+            3. Why they would be interested in the offerings (be VERY specific about which offerings and how they would use them)
+            4. Match Score (a percentage between 60-95% indicating how good of a match they are)
+            5. Potential Value (estimated annual contract value, e.g. $10K-$50K, $50K-$100K, etc.)
+            
+            Return the results in this JSON format:
+            {{"potential_matches": [
+                {{"company_name": "Company Name", 
+                  "industry": "Industry", 
+                  "match_reason": "Detailed reason for match", 
+                  "match_score": 85, 
+                  "potential_value": "$10K-$50K"}},
+                ...
+            ]}}
+            
+            IMPORTANT GUIDELINES:
+            - Focus on companies that would genuinely benefit from the specific offerings
+            - Be very specific about WHY each company would benefit from the offerings
+            - Ensure match scores accurately reflect how well the company aligns with the offerings
+            - Provide realistic potential value estimates based on company size and industry
+            - Use real company names that make sense for the industry
+            
+            Return ONLY the JSON with no additional text.
+            """
+
+# Decision maker roles by industry, most relevant first
+_INDUSTRY_ROLES = {
+    'Technology': ['CTO', 'CIO', 'VP of Engineering', 'IT Director', 'Head of Digital'],
+    'Healthcare': ['Medical Director', 'Chief of Operations', 'Head of Patient Services', 'IT Director', 'Clinical Director'],
+    'Finance': ['CFO', 'Head of Risk', 'Investment Director', 'VP of Operations', 'Technology Director'],
+    'Education': ['Dean', 'Principal', 'Director of IT', 'Head of Operations', 'Chief Academic Officer'],
+    'Manufacturing': ['COO', 'Production Director', 'VP of Operations', 'Supply Chain Manager', 'Plant Manager'],
+    'Retail': ['CMO', 'Head of Merchandising', 'Operations Director', 'Digital Director', 'Customer Experience Manager'],
+    'Consulting': ['Managing Partner', 'Practice Lead', 'Director of Operations', 'Business Development Manager', 'Senior Consultant']
+}
+
+# Decision maker roles by offering category, most relevant first
+_CATEGORY_ROLES = {
+    'tech_solution': ['CTO', 'CIO', 'IT Director', 'Digital Transformation Lead'],
+    'digital_transformation': ['CIO', 'Digital Director', 'Head of Innovation', 'Technology Transformation Lead'],
+    'professional_service': ['COO', 'VP of Operations', 'Director of Professional Services'],
+    'business_advisory': ['CEO', 'COO', 'Strategy Director', 'Business Development Lead'],
+    'product_solution': ['Product Director', 'Operations Manager', 'Supply Chain Director'],
+    'equipment_provider': ['Operations Director', 'Facilities Manager', 'Production Manager'],
+    'marketing_solution': ['CMO', 'Marketing Director', 'Brand Manager', 'Digital Marketing Lead'],
+    'brand_development': ['CMO', 'Brand Director', 'Marketing Manager'],
+    'financial_service': ['CFO', 'Finance Director', 'Controller', 'Treasurer'],
+    'payment_solution': ['CFO', 'Finance Director', 'Payments Manager'],
+    'business_solution': ['COO', 'Operations Director', 'Business Process Manager'],
+    'industry_service': ['COO', 'Operations Director', 'Service Director']
+}
+
+# Outreach suggestions by role type (shared; callers copy a list before adding to it)
+_ROLE_SUGGESTIONS = {
+    'CTO': [
+        "Focus on technical benefits and integration capabilities",
+        "Highlight how your solution addresses technical challenges",
+        "Discuss scalability and future-proofing aspects"
+    ],
+    'CIO': [
+        "Emphasize ROI and business value of your technical solution",
+        "Address security and compliance considerations",
+        "Discuss how your solution fits into their overall IT strategy"
+    ],
+    'COO': [
+        "Focus on operational efficiency improvements",
+        "Highlight cost-saving aspects of your solution",
+        "Discuss implementation timeline and minimal disruption"
+    ],
+    'CMO': [
+        "Emphasize customer experience benefits",
+        "Highlight marketing and brand enhancement capabilities",
+        "Discuss analytics and measurement aspects"
+    ],
+    'CFO': [
+        "Focus on financial benefits and ROI",
+        "Highlight cost reduction and revenue growth potential",
+        "Discuss pricing model and payment flexibility"
+    ]
+}
+
+# Role title keywords in priority order; the first group found in a role picks its suggestions
+_ROLE_SUGGESTION_KEYWORDS = (
+    ('CTO', ('CTO', 'IT', 'Technical', 'Technology', 'Digital')),
+    ('CIO', ('CIO',)),
+    ('COO', ('COO', 'Operations')),
+    ('CMO', ('CMO', 'Marketing')),
+    ('CFO', ('CFO', 'Finance'))
+)
+
+_GENERIC_SUGGESTIONS = [
+    "Highlight how your solution addresses their specific industry challenges",
+    "Focus on the business value and ROI of your offering",
+    "Personalize your approach based on their role and responsibilities"
+]
+
+@lru_cache(maxsize=256)
+def _suggestions_for_role(role):
+    """Outreach suggestions for a role title; roles come from fixed tables, so each is classified once"""
+    for key, keywords in _ROLE_SUGGESTION_KEYWORDS:
+        if any(keyword in role for keyword in keywords):
+            return _ROLE_SUGGESTIONS[key]
+    return _GENERIC_SUGGESTIONS
+
+# Roles used when neither the industry nor the offering category has specific ones
+_GENERIC_TARGET_ROLES = ('COO', 'Operations Director', 'Business Development Manager')
+
+@lru_cache(maxsize=256)
+def _target_roles(industry, category):
+    """Decision maker roles for an industry and offering category, computed once per pair (shared; do not mutate)"""
+    # Combine the top 2 industry roles and the top 2 category roles
+    roles = _INDUSTRY_ROLES.get(industry, [])[:2] + _CATEGORY_ROLES.get(category, [])[:2]
+    
+    # If we don't have specific roles, use generic ones
+    if not roles:
+        return _GENERIC_TARGET_ROLES
+    
+    # Remove duplicates
+    return tuple(dict.fromkeys(roles))
+
+# Offering categories by the terms (matched as substrings of the lowercased offering) that identify them
+_OFFERING_CATEGORY_TERMS = (
+    # Technology-related offerings
+    (('software', 'app', 'platform', 'tech', 'digital', 'ai', 'data', 'cloud', 'automation'),
+     ('tech_solution', 'digital_transformation')),
+    # Service-related offerings
+    (('service', 'consulting', 'support', 'management', 'strategy', 'advisory'),
+     ('professional_service', 'business_advisory')),
+    # Product-related offerings
+    (('product', 'equipment', 'device', 'hardware', 'tool', 'system'),
+     ('product_solution', 'equipment_provider')),
+    # Marketing-related offerings
+    (('marketing', 'brand', 'advertising', 'promotion', 'content', 'media'),
+     ('marketing_solution', 'brand_development')),
+    # Financial-related offerings
+    (('finance', 'payment', 'banking', 'investment', 'accounting', 'tax'),
+     ('financial_service', 'payment_solution'))
+)
+
+# Categories used when no specific terms match
+_GENERIC_OFFERING_CATEGORIES = ('business_solution', 'industry_service')
+
+# One alternation per category, so each category costs a single C-level search of the offering
+_OFFERING_CATEGORY_PATTERNS = tuple(
+    (re.compile('|'.join(map(re.escape, terms))), term_categories)
+    for terms, term_categories in _OFFERING_CATEGORY_TERMS
+)
+
+@lru_cache(maxsize=256)
+def _categories_for_offering(offering):
+    """Offering categories for a lowercased offering; offerings repeat across analyses, so each is scanned once"""
+    categories = tuple(category
+                       for pattern, term_categories in _OFFERING_CATEGORY_PATTERNS
+                       if pattern.search(offering)
+                       for category in term_categories)
+    return categories or _GENERIC_OFFERING_CATEGORIES
+
+# Industries that would be interested in each offering category
+_CATEGORY_INDUSTRIES = {
+    'tech_solution': ('Technology', 'Finance', 'Healthcare', 'Retail', 'Education'),
+    'digital_transformation': ('Manufacturing', 'Finance', 'Healthcare', 'Retail'),
+    'professional_service': ('Consulting', 'Finance', 'Technology', 'Healthcare'),
+    'business_advisory': ('Finance', 'Technology', 'Manufacturing', 'Retail'),
+    'product_solution': ('Manufacturing', 'Retail', 'Healthcare', 'Technology'),
+    'equipment_provider': ('Manufacturing', 'Healthcare', 'Education'),
+    'marketing_solution': ('Retail', 'Technology', 'Finance', 'Healthcare'),
+    'brand_development': ('Retail', 'Technology', 'Finance'),
+    'financial_service': ('Finance', 'Technology', 'Retail', 'Healthcare'),
+    'payment_solution': ('Retail', 'Finance', 'Technology'),
+    'business_solution': ('Technology', 'Finance', 'Consulting', 'Manufacturing'),
+    'industry_service': ('Technology', 'Healthcare', 'Finance', 'Manufacturing', 'Retail')
+}
+
+# Target industries for unknown categories, or when every category industry was filtered out
+_DEFAULT_TARGET_INDUSTRIES = ('Technology', 'Finance', 'Retail')
+
+# Match score bonus by offering category and the matched company's industry
+_INDUSTRY_RELEVANCE = {
+    'tech_solution': {'Technology': 20, 'Finance': 15, 'Healthcare': 10, 'Retail': 10, 'Education': 5},
+    'digital_transformation': {'Manufacturing': 20, 'Finance': 15, 'Healthcare': 15, 'Retail': 10},
+    'professional_service': {'Consulting': 20, 'Finance': 15, 'Technology': 10, 'Healthcare': 5},
+    'business_advisory': {'Finance': 20, 'Technology': 15, 'Manufacturing': 10, 'Retail': 5},
+    'product_solution': {'Manufacturing': 20, 'Retail': 15, 'Healthcare': 10, 'Technology': 5},
+    'equipment_provider': {'Manufacturing': 20, 'Healthcare': 15, 'Education': 10},
+    'marketing_solution': {'Retail': 20, 'Technology': 15, 'Finance': 10, 'Healthcare': 5},
+    'brand_development': {'Retail': 20, 'Technology': 15, 'Finance': 10},
+    'financial_service': {'Finance': 20, 'Technology': 15, 'Retail': 10, 'Healthcare': 5},
+    'payment_solution': {'Retail': 20, 'Finance': 15, 'Technology': 10},
+    'business_solution': {'Technology': 15, 'Finance': 15, 'Consulting': 15, 'Manufacturing': 10},
+    'industry_service': {'Technology': 15, 'Healthcare': 15, 'Finance': 15, 'Manufacturing': 10, 'Retail': 10}
+}
+
+# Estimated annual contract value by company size
+_SIZE_POTENTIAL_VALUES = {
+    'Large': '$100K-$500K',
+    'Medium': '$50K-$100K',
+    'Small': '$10K-$50K'
+}
+_POTENTIAL_VALUE_SIZES = {value: size for size, value in _SIZE_POTENTIAL_VALUES.items()}
+
+# Company sizes ordered smallest to largest, for size comparisons
+_SIZE_TIERS = {'Small': 0, 'Medium': 1, 'Large': 2}
+
+def _size_or_small(company_size):
+    """A known company size, or Small for anything else"""
+    return company_size if company_size in _SIZE_POTENTIAL_VALUES else 'Small'
+
+def _size_for_potential_value(potential_value):
+    """Company size for an estimated contract value; the standard ranges map directly, others by their amounts"""
+    size = _POTENTIAL_VALUE_SIZES.get(potential_value)
+    if size:
+        return size
+    if '$100K' in potential_value or '$500K' in potential_value:
+        return 'Large'
+    if '$50K' in potential_value:
+        return 'Medium'
+    return 'Small'
+
+# Common email patterns for different companies
+_EMAIL_PATTERNS = (
+    "{first}.{last}@{domain}",
+    "{first_initial}{last}@{domain}",
+    "{first}@{domain}",
+    "{last}@{domain}",
+    "{first_initial}.{last}@{domain}",
+    "{first}{last_initial}@{domain}"
+)
+
+# External company domains by industry
+_INDUSTRY_DOMAINS = {
+    'Technology': ('techcorp.com', 'innovatetech.io', 'nextsoftware.com', 'cloudservices.net', 'datatech.ai'),
+    'Healthcare': ('healthsolutions.org', 'medicalgroup.com', 'careproviders.net', 'healthtech.io', 'medicalservices.com'),
+    'Finance': ('financialgroup.com', 'investmentfirm.com', 'bankingsolutions.net', 'wealthmanagement.com', 'fintech.io'),
+    'Education': ('learningsolutions.org', 'educationgroup.com', 'academicservices.net', 'trainingpro.com', 'edtech.io'),
+    'Manufacturing': ('industrialsolutions.com', 'manufacturinggroup.net', 'productionservices.com', 'factorytech.io', 'industrialequipment.com'),
+    'Retail': ('retailgroup.com', 'shoppingsolutions.net', 'consumerproducts.com', 'retailtech.io', 'marketingsolutions.com'),
+    'Consulting': ('consultinggroup.com', 'advisoryservices.net', 'businessconsultants.com', 'strategyadvisors.io', 'consultingfirm.com')
+}
+
+# External company names by industry, in the same order as their domains
+_INDUSTRY_COMPANIES = {
+    'Technology': ('TechCorp', 'InnovateTech', 'NextSoftware', 'CloudServices', 'DataTech'),
+    'Healthcare': ('HealthSolutions', 'MedicalGroup', 'CareProviders', 'HealthTech', 'MedicalServices'),
+    'Finance': ('FinancialGroup', 'InvestmentFirm', 'BankingSolutions', 'WealthManagement', 'FinTech'),
+    'Education': ('LearningSolutions', 'EducationGroup', 'AcademicServices', 'TrainingPro', 'EdTech'),
+    'Manufacturing': ('IndustrialSolutions', 'ManufacturingGroup', 'ProductionServices', 'FactoryTech', 'IndustrialEquipment'),
+    'Retail': ('RetailGroup', 'ShoppingSolutions', 'ConsumerProducts', 'RetailTech', 'MarketingSolutions'),
+    'Consulting': ('ConsultingGroup', 'AdvisoryServices', 'BusinessConsultants', 'StrategyAdvisors', 'ConsultingFirm')
+}
+
+# Prebuilt formatters for the default email patterns, called with the lowercased first and last name
+_EMAIL_BUILDERS = {
+    "{first}.{last}@{domain}": lambda first, last, domain: f"{first}.{last}@{domain}",
+    "{first_initial}{last}@{domain}": lambda first, last, domain: f"{first[0]}{last}@{domain}",
+    "{first}@{domain}": lambda first, last, domain: f"{first}@{domain}",
+    "{last}@{domain}": lambda first, last, domain: f"{last}@{domain}",
+    "{first_initial}.{last}@{domain}": lambda first, last, domain: f"{first[0]}.{last}@{domain}",
+    "{first}{last_initial}@{domain}": lambda first, last, domain: f"{first}{last[0]}@{domain}"
+}
+
+# Common first and last names for generated leads
+_FIRST_NAMES = (
+    'James', 'John', 'Robert', 'Michael', 'William', 'David', 'Richard', 'Joseph', 'Thomas', 'Charles',
+    'Mary', 'Patricia', 'Jennifer', 'Linda', 'Elizabeth', 'Barbara', 'Susan', 'Jessica', 'Sarah', 'Karen',
+    'Christopher', 'Daniel', 'Matthew', 'Anthony', 'Mark', 'Donald', 'Steven', 'Paul', 'Andrew', 'Joshua',
+    'Michelle', 'Amanda', 'Kimberly', 'Melissa', 'Stephanie', 'Rebecca', 'Laura', 'Emily', 'Megan', 'Hannah'
+)
+
+_LAST_NAMES = (
+    'Smith', 'Johnson', 'Williams', 'Jones', 'Brown', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor',
+    'Anderson', 'Thomas', 'Jackson', 'White', 'Harris', 'Martin', 'Thompson', 'Garcia', 'Martinez', 'Robinson',
+    'Clark', 'Rodriguez', 'Lewis', 'Lee', 'Walker', 'Hall', 'Allen', 'Young', 'Hernandez', 'King',
+    'Wright', 'Lopez', 'Hill', 'Scott', 'Green', 'Adams', 'Baker', 'Gonzalez', 'Nelson', 'Carter'
+)
 
 class LeadGenerator:
     """Class to identify potential external leads based on company analysis"""
     
+    # External companies by industry; subclasses or callers can replace these shared tables
+    industry_domains = _INDUSTRY_DOMAINS
+    industry_companies = _INDUSTRY_COMPANIES
+    
     def __init__(self, use_cache=True, cache_expiry=86400):
         """Initialize the lead generator with caching options"""
         self.use_cache = use_cache
         self.cache_expiry = cache_expiry
         
-        # Common email patterns for different companies
-        self.email_patterns = [
-            "{first}.{last}@{domain}",
-            "{first_initial}{last}@{domain}",
-            "{first}@{domain}",
-            "{last}@{domain}",
-            "{first_initial}.{last}@{domain}",
-            "{first}{last_initial}@{domain}"
-        ]
-        
-        # External company domains by industry
-        self.industry_domains = {
-            'Technology': ['techcorp.com', 'innovatetech.io', 'nextsoftware.com', 'cloudservices.net', 'datatech.ai'],
-            'Healthcare': ['healthsolutions.org', 'medicalgroup.com', 'careproviders.net', 'healthtech.io', 'medicalservices.com'],
-            'Finance': ['financialgroup.com', 'investmentfirm.com', 'bankingsolutions.net', 'wealthmanagement.com', 'fintech.io'],
-            'Education': ['learningsolutions.org', 'educationgroup.com', 'academicservices.net', 'trainingpro.com', 'edtech.io'],
-            'Manufacturing': ['industrialsolutions.com', 'manufacturinggroup.net', 'productionservices.com', 'factorytech.io', 'industrialequipment.com'],
-            'Retail': ['retailgroup.com', 'shoppingsolutions.net', 'consumerproducts.com', 'retailtech.io', 'marketingsolutions.com'],
-            'Consulting': ['consultinggroup.com', 'advisoryservices.net', 'businessconsultants.com', 'strategyadvisors.io', 'consultingfirm.com']
-        }
-        
-        # External company names by industry
-        self.industry_companies = {
-            'Technology': ['TechCorp', 'InnovateTech', 'NextSoftware', 'CloudServices', 'DataTech'],
-            'Healthcare': ['HealthSolutions', 'MedicalGroup', 'CareProviders', 'HealthTech', 'MedicalServices'],
-            'Finance': ['FinancialGroup', 'InvestmentFirm', 'BankingSolutions', 'WealthManagement', 'FinTech'],
-            'Education': ['LearningSolutions', 'EducationGroup', 'AcademicServices', 'TrainingPro', 'EdTech'],
-            'Manufacturing': ['IndustrialSolutions', 'ManufacturingGroup', 'ProductionServices', 'FactoryTech', 'IndustrialEquipment'],
-            'Retail': ['RetailGroup', 'ShoppingSolutions', 'ConsumerProducts', 'RetailTech', 'MarketingSolutions'],
-            'Consulting': ['ConsultingGroup', 'AdvisoryServices', 'BusinessConsultants', 'StrategyAdvisors', 'ConsultingFirm']
-        }
+        # Per-instance copy so callers can add their own patterns
+        self.email_patterns = list(_EMAIL_PATTERNS)
+    
     def generate_leads(self, company_analysis, domain):
         """Generate potential leads based on company analysis"""
         # Check cache first if enabled
@@ -62,10 +335,9 @@ class LeadGenerator:
         # Generate external leads (potential customers or partners)
         leads = self._generate_external_leads(company_analysis, domain)
         
-        # Add timestamp for cache management
+        # The cache store records when each entry was written, so no timestamp is stored
         result = {
-            'leads': leads,
-            'timestamp': datetime.now().isoformat()
+            'leads': leads
         }
         
         # Cache the results if enabled
@@ -132,27 +404,7 @@ class LeadGenerator:
         
     def _infer_offerings_from_industry(self, industry, company_type):
         """Infer potential offerings based on industry and company type"""
-        industry_offerings = {
-            'Technology': ['Software Development', 'IT Consulting', 'Cloud Services', 'Data Analytics', 'Cybersecurity'],
-            'Healthcare': ['Medical Services', 'Healthcare IT', 'Patient Management', 'Medical Equipment', 'Telehealth'],
-            'Finance': ['Financial Services', 'Investment Management', 'Banking Solutions', 'Insurance', 'Payment Processing'],
-            'Education': ['Educational Content', 'Learning Management', 'Student Services', 'Educational Technology', 'Training Programs'],
-            'Manufacturing': ['Production Services', 'Supply Chain Management', 'Quality Control', 'Equipment Manufacturing', 'Industrial Design'],
-            'Retail': ['E-commerce Solutions', 'Inventory Management', 'Customer Experience', 'Point of Sale Systems', 'Retail Analytics'],
-            'Consulting': ['Business Strategy', 'Management Consulting', 'Process Improvement', 'Change Management', 'Industry Expertise']
-        }
-        
-        if industry in industry_offerings:
-            # Return the top 3 most relevant offerings for this industry
-            return industry_offerings[industry][:3]
-        else:
-            # Generic offerings based on company type
-            if company_type == 'B2B':
-                return ['Business Services', 'Professional Solutions', 'Enterprise Software']
-            elif company_type == 'B2C':
-                return ['Consumer Products', 'Customer Services', 'Retail Solutions']
-            else:
-                return ['Professional Services', 'Industry Solutions', 'Specialized Expertise']
+        return list(_infer_offerings(industry, company_type))
     def _generate_potential_matches_with_llm(self, industry, offerings, target_market, company_size, company_description):
         """Generate potential customer matches using LLM for more accurate and specific results"""
         try:
@@ -168,54 +420,33 @@ class LeadGenerator:
             offerings_str = ", ".join(offerings) if isinstance(offerings, list) else offerings
             target_market_str = ", ".join(target_market) if isinstance(target_market, list) else target_market
             
-            prompt = f"""
-            You are a lead generation expert. Based on the following company profile, generate 5-7 SPECIFIC potential customer companies that would be interested in their offerings.
-            
-            Company Profile:
-            - Industry: {industry}
-            - Offerings: {offerings_str}
-            - Target Market: {target_market_str}
-            - Company Size: {company_size}
-            - Description: {company_description}
-            
-            For each potential customer, provide:
-            1. Company Name (use REAL company names, not generic ones like 'Tech Solutions Inc')
-            2. Industry they operate in (be specific)
-            3. Why they would be interested in the offerings (be VERY specific about which offerings and how they would use them)
-            4. Match Score (a percentage between 60-95% indicating how good of a match they are)
-            5. Potential Value (estimated annual contract value, e.g. $10K-$50K, $50K-$100K, etc.)
-            
-            Return the results in this JSON format:
-            {{"potential_matches": [
-                {{"company_name": "Company Name", 
-                  "industry": "Industry", 
-                  "match_reason": "Detailed reason for match", 
-                  "match_score": 85, 
-                  "potential_value": "$10K-$50K"}},
-                ...
-            ]}}
-            
-            IMPORTANT GUIDELINES:
-            - Focus on companies that would genuinely benefit from the specific offerings
-            - Be very specific about WHY each company would benefit from the offerings
-            - Ensure match scores accurately reflect how well the company aligns with the offerings
-            - Provide realistic potential value estimates based on company size and industry
-            - Use real company names that make sense for the industry
-            
-            Return ONLY the JSON with no additional text.
-            """
-            
-            # Query the LLM
-            response = query_llm(prompt)
+            prompt = _MATCHES_PROMPT_TEMPLATE.format(
+                industry=industry,
+                offerings_str=offerings_str,
+                target_market_str=target_market_str,
+                company_size=company_size,
+                company_description=company_description
+            )
+            
+            # Companies with the same profile get the same matches, whatever their domain
+            if self.use_cache:
+                cache_key = self._matches_cache_key(industry, offerings, target_market, company_size, company_description)
+                cached_matches = self._check_cache(cache_key, 'matches')
+                if cached_matches:
+                    print(f"Using cached LLM matches for this {industry} profile")
+                    return cached_matches
+            
+            # Query the LLM; JSON mode keeps the reply a bare object and streaming stops reading once it closes
+            response = query_llm(prompt, stop_at_json_end=True, json_mode=True)
             
             # Parse the response as JSON
             try:
                 # Try to extract JSON from the response
-                json_match = re.search(r'```(?:json)?\s*({[\s\S]*?})\s*```', response)
+                json_match = _JSON_FENCE_RE.search(response)
                 if json_match:
                     response = json_match.group(1)
                 
-                data = json.loads(response)
+                data = json_loads(response)
                 valid_matches = []
                 
                 # Validate and process each match
@@ -237,38 +468,26 @@ class LeadGenerator:
                         
                         # Ensure potential_value is present
                         if 'potential_value' not in match or not match['potential_value']:
-                            if company_size == 'Large':
-                                match['potential_value'] = '$100K-$500K'
-                            elif company_size == 'Medium':
-                                match['potential_value'] = '$50K-$100K'
-                            else:
-                                match['potential_value'] = '$10K-$50K'
+                            match['potential_value'] = _SIZE_POTENTIAL_VALUES[_size_or_small(company_size)]
                         
                         # Add offering category for compatibility with existing code
                         match['offering_category'] = 'llm_generated'
                         
                         # Add domain field if not present
                         if 'domain' not in match:
-                            # Generate a domain from the company name
-                            company_name = match['company_name'].lower()
-                            # Remove non-alphanumeric characters and spaces
-                            domain_base = ''.join(e for e in company_name if e.isalnum() or e.isspace())
-                            domain_base = domain_base.replace(' ', '')
-                            match['domain'] = f"{domain_base}.com"
+                            # Generate a domain from the company name without non-alphanumeric characters and spaces
+                            match['domain'] = f"{_BAD_CHAR_RE.sub('', match['company_name'].lower())}.com"
                             
                         # Add size field if not present
                         if 'size' not in match:
                             # Use a size based on the potential value or a default
-                            potential_value = match.get('potential_value', '')
-                            if '$100K' in potential_value or '$500K' in potential_value:
-                                match['size'] = 'Large'
-                            elif '$50K' in potential_value:
-                                match['size'] = 'Medium'
-                            else:
-                                match['size'] = 'Small'
+                            match['size'] = _size_for_potential_value(match['potential_value'])
                         
                         valid_matches.append(match)
                 
+                if self.use_cache and valid_matches:
+                    self._cache_results(cache_key, {'matches': valid_matches})
+                
                 return valid_matches
             except json.JSONDecodeError as e:
                 print(f"Failed to parse LLM response as JSON: {str(e)}")
@@ -279,6 +498,17 @@ class LeadGenerator:
             print(f"Error generating matches with LLM: {str(e)}")
             return self._generate_fallback_matches(industry, offerings, target_market, company_size)
             
+    def _matches_cache_key(self, industry, offerings, target_market, company_size, company_description):
+        """Cache key for the LLM matches of a company profile; list order doesn't change the matches"""
+        profile = [
+            industry,
+            sorted(offerings, key=str) if isinstance(offerings, list) else offerings,
+            sorted(target_market, key=str) if isinstance(target_market, list) else target_market,
+            company_size,
+            company_description
+        ]
+        return 'llm_matches_' + hashlib.sha256(json.dumps(profile, default=str).encode('utf-8')).hexdigest()
+    
     def _generate_fallback_matches(self, industry, offerings, target_market, company_size):
         """Generate fallback matches when LLM fails"""
         print("Using fallback match generation")
@@ -311,30 +541,13 @@ class LeadGenerator:
             else:
                 match_reason = f"Would benefit from products/services in the {industry} sector."
             
-            # Generate match score and potential value
+            # Generate match score, and the size and potential value that go with the company size
             match_score = random.randint(70, 90)
+            size = _size_or_small(company_size)
+            potential_value = _SIZE_POTENTIAL_VALUES[size]
             
-            if company_size == 'Large':
-                potential_value = '$100K-$500K'
-            elif company_size == 'Medium':
-                potential_value = '$50K-$100K'
-            else:
-                potential_value = '$10K-$50K'
-            
-            # Generate a domain from the company name
-            company_name_lower = company_name.lower()
-            # Remove non-alphanumeric characters and spaces
-            domain_base = ''.join(e for e in company_name_lower if e.isalnum() or e.isspace())
-            domain_base = domain_base.replace(' ', '')
-            domain = f"{domain_base}.com"
-            
-            # Determine size based on potential value
-            if '$100K' in potential_value or '$500K' in potential_value:
-                size = 'Large'
-            elif '$50K' in potential_value:
-                size = 'Medium'
-            else:
-                size = 'Small'
+            # Generate a domain from the company name without non-alphanumeric characters and spaces
+            domain = f"{_BAD_CHAR_RE.sub('', company_name.lower())}.com"
                 
             matches.append({
                 'company_name': company_name,
@@ -351,7 +564,8 @@ class LeadGenerator:
     
     def _determine_potential_matches(self, industry, offerings, target_market, company_size):
         """Determine potential customer matches based on detailed analysis of offerings"""
-        potential_matches = []
+        # Matches keyed by domain; the same company might match multiple offerings, and the first match is kept
+        unique_matches = {}
         
         # Convert offerings and target_market to lists if they're not already
         if isinstance(offerings, str):
@@ -368,8 +582,9 @@ class LeadGenerator:
         for offering in offerings:
             offering_lower = offering.lower()
             
-            # Identify offering category and potential customer types
+            # Identify offering category and potential customer types; the first one drives the match score
             offering_categories = self._categorize_offering(offering_lower)
+            primary_category = offering_categories[0] if offering_categories else 'business_solution'
             
             # For each category, identify potential companies that would need this offering
             for category in offering_categories:
@@ -377,30 +592,27 @@ class LeadGenerator:
                 matches = self._find_companies_for_category(category, industry, company_size)
                 
                 for match in matches:
+                    domain = match['domain']
+                    if domain in unique_matches:
+                        continue
+                    
                     # Calculate match score based on relevance
-                    match_score = self._calculate_match_score(match, offering, target_market, company_size)
+                    match_score = self._calculate_match_score(match, primary_category, target_market, company_size)
                     
                     # Generate specific reason why this company would need the offering
                     match_reason = self._generate_specific_match_reason(match, offering, category)
                     
-                    potential_matches.append({
+                    unique_matches[domain] = {
                         'company_name': match['name'],
-                        'domain': match['domain'],
+                        'domain': domain,
                         'industry': match['industry'],
                         'size': match['size'],
                         'match_score': match_score,
                         'match_reason': match_reason,
                         'offering_category': category
-                    })
+                    }
         
-        # Remove duplicates (same company might match multiple offerings)
-        unique_matches = []
-        seen_domains = set()
-        
-        for match in potential_matches:
-            if match['domain'] not in seen_domains:
-                seen_domains.add(match['domain'])
-                unique_matches.append(match)
+        unique_matches = list(unique_matches.values())
         
         # Ensure we have at least some matches
         if not unique_matches:
@@ -424,63 +636,18 @@ class LeadGenerator:
         
     def _categorize_offering(self, offering):
         """Categorize an offering to determine potential customer types"""
-        categories = []
-        
-        # Technology-related offerings
-        if any(term in offering for term in ['software', 'app', 'platform', 'tech', 'digital', 'ai', 'data', 'cloud', 'automation']):
-            categories.extend(['tech_solution', 'digital_transformation'])
-            
-        # Service-related offerings
-        if any(term in offering for term in ['service', 'consulting', 'support', 'management', 'strategy', 'advisory']):
-            categories.extend(['professional_service', 'business_advisory'])
-            
-        # Product-related offerings
-        if any(term in offering for term in ['product', 'equipment', 'device', 'hardware', 'tool', 'system']):
-            categories.extend(['product_solution', 'equipment_provider'])
-            
-        # Marketing-related offerings
-        if any(term in offering for term in ['marketing', 'brand', 'advertising', 'promotion', 'content', 'media']):
-            categories.extend(['marketing_solution', 'brand_development'])
-            
-        # Financial-related offerings
-        if any(term in offering for term in ['finance', 'payment', 'banking', 'investment', 'accounting', 'tax']):
-            categories.extend(['financial_service', 'payment_solution'])
-            
-        # If no specific categories identified, use generic ones
-        if not categories:
-            categories = ['business_solution', 'industry_service']
-            
-        return categories
+        return list(_categories_for_offering(offering))
     def _find_companies_for_category(self, category, source_industry, company_size):
         """Find companies that would be interested in a specific offering category"""
         companies = []
         
-        # Define which industries would be interested in each category
-        category_to_industries = {
-            'tech_solution': ['Technology', 'Finance', 'Healthcare', 'Retail', 'Education'],
-            'digital_transformation': ['Manufacturing', 'Finance', 'Healthcare', 'Retail'],
-            'professional_service': ['Consulting', 'Finance', 'Technology', 'Healthcare'],
-            'business_advisory': ['Finance', 'Technology', 'Manufacturing', 'Retail'],
-            'product_solution': ['Manufacturing', 'Retail', 'Healthcare', 'Technology'],
-            'equipment_provider': ['Manufacturing', 'Healthcare', 'Education'],
-            'marketing_solution': ['Retail', 'Technology', 'Finance', 'Healthcare'],
-            'brand_development': ['Retail', 'Technology', 'Finance'],
-            'financial_service': ['Finance', 'Technology', 'Retail', 'Healthcare'],
-            'payment_solution': ['Retail', 'Finance', 'Technology'],
-            'business_solution': ['Technology', 'Finance', 'Consulting', 'Manufacturing'],
-            'industry_service': ['Technology', 'Healthcare', 'Finance', 'Manufacturing', 'Retail']
-        }
-        
-        # Get target industries for this category
-        target_industries = category_to_industries.get(category, ['Technology', 'Finance', 'Retail'])
-        
-        # Remove the source industry to avoid suggesting competitors
-        if source_industry in target_industries:
-            target_industries.remove(source_industry)
+        # Target industries for this category, without the source industry to avoid suggesting competitors
+        target_industries = tuple(industry for industry in _CATEGORY_INDUSTRIES.get(category, _DEFAULT_TARGET_INDUSTRIES)
+                                  if industry != source_industry)
             
         # If we have no industries left, add some generic ones
         if not target_industries:
-            target_industries = ['Technology', 'Finance', 'Retail']
+            target_industries = _DEFAULT_TARGET_INDUSTRIES
             
         # For each target industry, add companies
         for industry in target_industries:
@@ -500,44 +667,23 @@ class LeadGenerator:
                         'size': size
                     })
         
-        # Shuffle to get different results each time
-        random.shuffle(companies)
+        # Pick up to 5 companies at random to get different results each time
+        return random.sample(companies, min(5, len(companies)))
         
-        return companies[:5]  # Return up to 5 companies
-        
-    def _calculate_match_score(self, match, offering, target_market, company_size):
-        """Calculate a match score (0-100) based on relevance"""
+    def _calculate_match_score(self, match, offering_category, target_market, company_size):
+        """Calculate a match score (0-100) based on relevance to the offering's primary category"""
         score = 70  # Start with a base score
         
-        # Adjust based on industry relevance
-        industry_relevance = {
-            'tech_solution': {'Technology': 20, 'Finance': 15, 'Healthcare': 10, 'Retail': 10, 'Education': 5},
-            'digital_transformation': {'Manufacturing': 20, 'Finance': 15, 'Healthcare': 15, 'Retail': 10},
-            'professional_service': {'Consulting': 20, 'Finance': 15, 'Technology': 10, 'Healthcare': 5},
-            'business_advisory': {'Finance': 20, 'Technology': 15, 'Manufacturing': 10, 'Retail': 5},
-            'product_solution': {'Manufacturing': 20, 'Retail': 15, 'Healthcare': 10, 'Technology': 5},
-            'equipment_provider': {'Manufacturing': 20, 'Healthcare': 15, 'Education': 10},
-            'marketing_solution': {'Retail': 20, 'Technology': 15, 'Finance': 10, 'Healthcare': 5},
-            'brand_development': {'Retail': 20, 'Technology': 15, 'Finance': 10},
-            'financial_service': {'Finance': 20, 'Technology': 15, 'Retail': 10, 'Healthcare': 5},
-            'payment_solution': {'Retail': 20, 'Finance': 15, 'Technology': 10},
-            'business_solution': {'Technology': 15, 'Finance': 15, 'Consulting': 15, 'Manufacturing': 10},
-            'industry_service': {'Technology': 15, 'Healthcare': 15, 'Finance': 15, 'Manufacturing': 10, 'Retail': 10}
-        }
-        
-        # Get the offering category
-        offering_categories = self._categorize_offering(offering.lower())
-        offering_category = offering_categories[0] if offering_categories else 'business_solution'
-        
         # Add industry relevance score
-        if offering_category in industry_relevance:
-            score += industry_relevance[offering_category].get(match['industry'], 0)
+        if offering_category in _INDUSTRY_RELEVANCE:
+            score += _INDUSTRY_RELEVANCE[offering_category].get(match['industry'], 0)
             
         # Adjust based on size compatibility
+        match_tier = _SIZE_TIERS.get(match['size'])
+        company_tier = _SIZE_TIERS.get(company_size)
         if match['size'] == company_size:
             score += 10  # Perfect size match
-        elif (match['size'] == 'Large' and company_size == 'Medium') or \
-             (match['size'] == 'Medium' and company_size == 'Small'):
+        elif match_tier is not None and company_tier is not None and match_tier == company_tier + 1:
             score += 5  # Good size match (larger customer for smaller provider)
             
         # Cap the score at 95 to leave room for randomness
@@ -662,51 +808,7 @@ class LeadGenerator:
             return "Low"
     def _get_target_roles_for_match(self, match):
         """Get appropriate decision maker roles based on the specific match"""
-        industry = match['industry']
-        category = match.get('offering_category', 'business_solution')
-        
-        # Industry-specific roles
-        industry_roles = {
-            'Technology': ['CTO', 'CIO', 'VP of Engineering', 'IT Director', 'Head of Digital'],
-            'Healthcare': ['Medical Director', 'Chief of Operations', 'Head of Patient Services', 'IT Director', 'Clinical Director'],
-            'Finance': ['CFO', 'Head of Risk', 'Investment Director', 'VP of Operations', 'Technology Director'],
-            'Education': ['Dean', 'Principal', 'Director of IT', 'Head of Operations', 'Chief Academic Officer'],
-            'Manufacturing': ['COO', 'Production Director', 'VP of Operations', 'Supply Chain Manager', 'Plant Manager'],
-            'Retail': ['CMO', 'Head of Merchandising', 'Operations Director', 'Digital Director', 'Customer Experience Manager'],
-            'Consulting': ['Managing Partner', 'Practice Lead', 'Director of Operations', 'Business Development Manager', 'Senior Consultant']
-        }
-        
-        # Category-specific roles
-        category_roles = {
-            'tech_solution': ['CTO', 'CIO', 'IT Director', 'Digital Transformation Lead'],
-            'digital_transformation': ['CIO', 'Digital Director', 'Head of Innovation', 'Technology Transformation Lead'],
-            'professional_service': ['COO', 'VP of Operations', 'Director of Professional Services'],
-            'business_advisory': ['CEO', 'COO', 'Strategy Director', 'Business Development Lead'],
-            'product_solution': ['Product Director', 'Operations Manager', 'Supply Chain Director'],
-            'equipment_provider': ['Operations Director', 'Facilities Manager', 'Production Manager'],
-            'marketing_solution': ['CMO', 'Marketing Director', 'Brand Manager', 'Digital Marketing Lead'],
-            'brand_development': ['CMO', 'Brand Director', 'Marketing Manager'],
-            'financial_service': ['CFO', 'Finance Director', 'Controller', 'Treasurer'],
-            'payment_solution': ['CFO', 'Finance Director', 'Payments Manager'],
-            'business_solution': ['COO', 'Operations Director', 'Business Process Manager'],
-            'industry_service': ['COO', 'Operations Director', 'Service Director']
-        }
-        
-        # Combine industry and category roles
-        roles = []
-        
-        if industry in industry_roles:
-            roles.extend(industry_roles[industry][:2])  # Take top 2 roles from industry
-            
-        if category in category_roles:
-            roles.extend(category_roles[category][:2])  # Take top 2 roles from category
-            
-        # If we don't have specific roles, use generic ones
-        if not roles:
-            roles = ['COO', 'Operations Director', 'Business Development Manager']
-            
-        # Remove duplicates and return
-        return list(dict.fromkeys(roles))
+        return _target_roles(match['industry'], match.get('offering_category', 'business_solution'))
     
     def _create_lead_for_role(self, role, domain, company_analysis):
         """Create a lead profile for a specific role"""
@@ -732,25 +834,9 @@ class LeadGenerator:
     
     def _generate_name_for_role(self, role):
         """Generate a realistic name for a role"""
-        # Common first names
-        first_names = [
-            'James', 'John', 'Robert', 'Michael', 'William', 'David', 'Richard', 'Joseph', 'Thomas', 'Charles',
-            'Mary', 'Patricia', 'Jennifer', 'Linda', 'Elizabeth', 'Barbara', 'Susan', 'Jessica', 'Sarah', 'Karen',
-            'Christopher', 'Daniel', 'Matthew', 'Anthony', 'Mark', 'Donald', 'Steven', 'Paul', 'Andrew', 'Joshua',
-            'Michelle', 'Amanda', 'Kimberly', 'Melissa', 'Stephanie', 'Rebecca', 'Laura', 'Emily', 'Megan', 'Hannah'
-        ]
-        
-        # Common last names
-        last_names = [
-            'Smith', 'Johnson', 'Williams', 'Jones', 'Brown', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor',
-            'Anderson', 'Thomas', 'Jackson', 'White', 'Harris', 'Martin', 'Thompson', 'Garcia', 'Martinez', 'Robinson',
-            'Clark', 'Rodriguez', 'Lewis', 'Lee', 'Walker', 'Hall', 'Allen', 'Young', 'Hernandez', 'King',
-            'Wright', 'Lopez', 'Hill', 'Scott', 'Green', 'Adams', 'Baker', 'Gonzalez', 'Nelson', 'Carter'
-        ]
-        
         # Randomly select a first and last name
-        first_name = random.choice(first_names)
-        last_name = random.choice(last_names)
+        first_name = random.choice(_FIRST_NAMES)
+        last_name = random.choice(_LAST_NAMES)
         
         return f"{first_name} {last_name}"
     
@@ -758,13 +844,20 @@ class LeadGenerator:
         """Generate potential email addresses based on common patterns"""
         # Select a random email pattern
         pattern = random.choice(self.email_patterns)
+        first = first_name.lower()
+        last = last_name.lower()
+        
+        # Default patterns have a prebuilt formatter; custom ones are parsed with str.format
+        builder = _EMAIL_BUILDERS.get(pattern)
+        if builder is not None:
+            return builder(first, last, domain)
         
         # Apply the pattern
         email = pattern.format(
-            first=first_name.lower(),
-            last=last_name.lower(),
-            first_initial=first_name[0].lower(),
-            last_initial=last_name[0].lower(),
+            first=first,
+            last=last,
+            first_initial=first[0],
+            last_initial=last[0],
             domain=domain
         )
         
@@ -778,52 +871,8 @@ class LeadGenerator:
         if isinstance(offerings, str):
             offerings = [offerings]
         
-        # Role-specific suggestions
-        role_suggestions = {
-            'CTO': [
-                "Focus on technical benefits and integration capabilities",
-                "Highlight how your solution addresses technical challenges",
-                "Discuss scalability and future-proofing aspects"
-            ],
-            'CIO': [
-                "Emphasize ROI and business value of your technical solution",
-                "Address security and compliance considerations",
-                "Discuss how your solution fits into their overall IT strategy"
-            ],
-            'COO': [
-                "Focus on operational efficiency improvements",
-                "Highlight cost-saving aspects of your solution",
-                "Discuss implementation timeline and minimal disruption"
-            ],
-            'CMO': [
-                "Emphasize customer experience benefits",
-                "Highlight marketing and brand enhancement capabilities",
-                "Discuss analytics and measurement aspects"
-            ],
-            'CFO': [
-                "Focus on financial benefits and ROI",
-                "Highlight cost reduction and revenue growth potential",
-                "Discuss pricing model and payment flexibility"
-            ]
-        }
-        
-        # Generic suggestions based on role type
-        if 'CTO' in role or 'IT' in role or 'Technical' in role or 'Technology' in role or 'Digital' in role:
-            suggestions = role_suggestions.get('CTO', [])
-        elif 'CIO' in role:
-            suggestions = role_suggestions.get('CIO', [])
-        elif 'COO' in role or 'Operations' in role:
-            suggestions = role_suggestions.get('COO', [])
-        elif 'CMO' in role or 'Marketing' in role:
-            suggestions = role_suggestions.get('CMO', [])
-        elif 'CFO' in role or 'Finance' in role:
-            suggestions = role_suggestions.get('CFO', [])
-        else:
-            suggestions = [
-                "Highlight how your solution addresses their specific industry challenges",
-                "Focus on the business value and ROI of your offering",
-                "Personalize your approach based on their role and responsibilities"
-            ]
+        # Generic suggestions based on role type (copied, since the offering line is appended)
+        suggestions = list(_suggestions_for_role(role))
         
         # Add offering-specific suggestions
         if offerings and offerings != ["Unknown - LLM analysis required"]:
@@ -831,46 +880,38 @@ class LeadGenerator:
             suggestions.append(f"Mention specific benefits of your {offering} for their role")
         
         return suggestions
-    def _check_cache(self, cache_key):
+    def _check_cache(self, cache_key, field='leads'):
         """Check if we have a valid cache for this analysis"""
-        cache_path = get_cache_path(cache_key, subdir='leads')
-        
-        if not os.path.exists(cache_path):
-            return None
-        
         try:
-            with open(cache_path, 'r') as f:
-                cached_data = json.load(f)
-            
-            # Check if cache is expired
-            timestamp = datetime.fromisoformat(cached_data.get('timestamp', '2000-01-01'))
-            now = datetime.now()
-            
-            if (now - timestamp).total_seconds() > self.cache_expiry:
-                print(f"Cache expired for {cache_key}")
-                return None
-                
-            return cached_data.get('leads', [])
+            # Recent entries are served from the store's in-memory LRU; expiry uses its write timestamp
+            cached_data = get_cache_store().get(cache_key, self.cache_expiry)
+            return cached_data.get(field, []) if cached_data else None
         except Exception as e:
             print(f"Error reading cache: {str(e)}")
             return None
     
     def _cache_results(self, cache_key, data):
         """Save results to cache"""
-        cache_path = get_cache_path(cache_key, subdir='leads')
-        
         try:
-            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-            with open(cache_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            get_cache_store().set(cache_key, data)
         except Exception as e:
             print(f"Error writing to cache: {str(e)}")
 
 # Function to be imported by other modules
+# Generators hold no per-request state, so one is shared per cache setting instead of being rebuilt for every call
+_generators = {}
+_generators_lock = threading.Lock()
+
+def get_lead_generator(use_cache=True):
+    """Get the shared LeadGenerator for a cache setting"""
+    with _generators_lock:
+        if use_cache not in _generators:
+            _generators[use_cache] = LeadGenerator(use_cache=use_cache)
+        return _generators[use_cache]
+
 def generate_leads(company_analysis, domain, use_cache=True):
     """Generate leads based on company analysis"""
-    generator = LeadGenerator(use_cache=use_cache)
-    return generator.generate_leads(company_analysis, domain)
+    return get_lead_generator(use_cache).generate_leads(company_analysis, domain)
 
 # For testing
 if __name__ == "__main__":
@@ -6,11 +6,32 @@ import os
 import json
 import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Import utility functions
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.helpers import clean_url, get_cache_path
+from utils.helpers import clean_url
+from analyzer.cache_store import get_cache_store
+
+# Patterns are compiled once at import instead of on every page
+_LOGO_ALT_RE = re.compile(r'logo', re.I)
+# Common title suffixes/prefixes like "Home | Company" or "Company - Home"
+_TITLE_SUFFIX_RE = re.compile(r'\s*[|:–—-]\s*.*$')
+_TITLE_PREFIX_RE = re.compile(r'^.*\s*[|:–—-]\s*')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Common page patterns to look for, one alternation per page type
+_PAGE_PATTERNS = {
+    page_type: re.compile('|'.join(patterns), re.I)
+    for page_type, patterns in {
+        'about': [r'/about', r'about-us', r'company', r'who-we-are'],
+        'team': [r'/team', r'our-team', r'leadership', r'management', r'people'],
+        'services': [r'/services', r'solutions', r'products', r'what-we-do'],
+        'contact': [r'/contact', r'contact-us', r'get-in-touch'],
+        'clients': [r'/clients', r'customers', r'case-studies', r'success-stories']
+    }.items()
+}
 
 class WebsiteScraper:
     """Class to handle website scraping operations"""
@@ -61,14 +82,20 @@ class WebsiteScraper:
         # Get important pages to scrape
         important_pages = self._get_important_pages(soup, url, domain)
         
-        # Scrape important pages
-        for page_type, page_url in important_pages.items():
-            try:
-                page_data = self._scrape_page(page_url)
-                company_data['important_pages'][page_type] = page_data
-            except Exception as e:
-                print(f"Error scraping {page_type} page: {str(e)}")
-                company_data['important_pages'][page_type] = {'error': str(e)}
+        # Scrape important pages concurrently; each fetch is network-bound
+        if important_pages:
+            with ThreadPoolExecutor(max_workers=len(important_pages)) as executor:
+                futures = {
+                    page_type: executor.submit(self._scrape_page, page_url)
+                    for page_type, page_url in important_pages.items()
+                }
+                for page_type, future in futures.items():
+                    try:
+                        page_data = future.result()
+                        company_data['important_pages'][page_type] = page_data
+                    except Exception as e:
+                        print(f"Error scraping {page_type} page: {str(e)}")
+                        company_data['important_pages'][page_type] = {'error': str(e)}
         
         # Cache the results if enabled
         if self.use_cache:
@@ -78,35 +105,17 @@ class WebsiteScraper:
     
     def _check_cache(self, url):
         """Check if we have a valid cache for this URL"""
-        cache_path = get_cache_path(url)
-        
-        if not os.path.exists(cache_path):
-            return None
-        
         try:
-            with open(cache_path, 'r') as f:
-                cached_data = json.load(f)
-            
-            # Check if cache is expired
-            timestamp = datetime.fromisoformat(cached_data.get('timestamp', '2000-01-01'))
-            now = datetime.now()
-            
-            if (now - timestamp).total_seconds() > self.cache_expiry:
-                print(f"Cache expired for {url}")
-                return None
-                
-            return cached_data
+            # Expiry is checked by the store against its own write timestamp
+            return get_cache_store().get(f"scrape_{url}", self.cache_expiry)
         except Exception as e:
             print(f"Error reading cache: {str(e)}")
             return None
     
     def _cache_results(self, url, data):
         """Save results to cache"""
-        cache_path = get_cache_path(url)
-        
         try:
-            with open(cache_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            get_cache_store().set(f"scrape_{url}", data)
         except Exception as e:
             print(f"Error writing to cache: {str(e)}")
     
@@ -115,7 +124,7 @@ class WebsiteScraper:
         # Try several methods to find the company name
         
         # Method 1: Look for logo alt text
-        logo = soup.find('img', {'alt': re.compile(r'logo', re.I)})
+        logo = soup.find('img', {'alt': _LOGO_ALT_RE})
         if logo and logo.get('alt') and len(logo.get('alt').split()) <= 5:
             return logo.get('alt').strip()
         
@@ -123,8 +132,8 @@ class WebsiteScraper:
         if soup.title:
             title = soup.title.text.strip()
             # Remove common suffixes like "Home | Company" or "Company - Home"
-            title = re.sub(r'\s*[|:–—-]\s*.*$', '', title)
-            title = re.sub(r'^.*\s*[|:–—-]\s*', '', title)
+            title = _TITLE_SUFFIX_RE.sub('', title)
+            title = _TITLE_PREFIX_RE.sub('', title)
             
             if len(title.split()) <= 5:  # Likely a company name if short
                 return title
@@ -182,22 +191,13 @@ class WebsiteScraper:
             main_content = soup.body.get_text(separator=' ', strip=True)
         
         # Clean up the text
-        main_content = re.sub(r'\s+', ' ', main_content).strip()
+        main_content = _WHITESPACE_RE.sub(' ', main_content).strip()
         return main_content
     
     def _get_important_pages(self, soup, base_url, domain):
         """Identify important pages to scrape"""
         important_pages = {}
         
-        # Common page patterns to look for
-        page_patterns = {
-            'about': [r'/about', r'about-us', r'company', r'who-we-are'],
-            'team': [r'/team', r'our-team', r'leadership', r'management', r'people'],
-            'services': [r'/services', r'solutions', r'products', r'what-we-do'],
-            'contact': [r'/contact', r'contact-us', r'get-in-touch'],
-            'clients': [r'/clients', r'customers', r'case-studies', r'success-stories']
-        }
-        
         # Find all links
         links = soup.find_all('a', href=True)
         
@@ -213,12 +213,9 @@ class WebsiteScraper:
                 continue
             
             # Check if it matches any important page pattern
-            for page_type, patterns in page_patterns.items():
-                if page_type not in important_pages:  # Only keep the first match
-                    for pattern in patterns:
-                        if re.search(pattern, href, re.I):
-                            important_pages[page_type] = href
-                            break
+            for page_type, pattern in _PAGE_PATTERNS.items():
+                if page_type not in important_pages and pattern.search(href):  # Only keep the first match
+                    important_pages[page_type] = href
         
         return important_pages
     
@@ -1,7 +1,19 @@
 import os
 import re
-import hashlib
-from urllib.parse import urlparse
+import json
+import tempfile
+from urllib.parse import urlparse, urlsplit
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
+
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+# This is a simplified pattern - real implementation would be more complex
+_PHONE_RE = re.compile(r'(?:\+\d{1,3}[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}')
+_VALID_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_INVALID_FILENAME_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
 
 def clean_url(url):
     """Clean and normalize a URL"""
@@ -23,22 +35,41 @@ def get_domain_from_url(url):
     parsed = urlparse(clean_url(url))
     return parsed.netloc
 
-def get_cache_path(key, subdir=None):
-    """Get the path to a cache file"""
-    # Create a hash of the key to use as filename
-    hash_obj = hashlib.md5(key.encode())
-    filename = hash_obj.hexdigest() + '.json'
-    
-    # Determine the cache directory
-    cache_dir = os.path.join('data', 'cache')
-    if subdir:
-        cache_dir = os.path.join(cache_dir, subdir)
-    
-    # Create the directory if it doesn't exist
-    os.makedirs(cache_dir, exist_ok=True)
-    
-    # Return the full path
-    return os.path.join(cache_dir, filename)
+def url_to_filename(url, ts):
+    """Get the results file path for a URL and a timestamp string"""
+    host = urlsplit(url).netloc
+    return f"data/results/{host}_{ts}.json"
+
+def json_dumps(data, indent=False):
+    """Serialize data to JSON bytes (compact unless indent is set), using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(data, indent=2).encode('utf-8')
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def json_loads(data):
+    """Parse JSON from str or bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def write_json_atomic(path, data, indent=False):
+    """Write data as JSON to path (compact unless indent is set), so readers never see a partially written file"""
+    # Write to a temp file in the same directory, then swap it into place
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json_dumps(data, indent=indent))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def read_json(path):
+    """Read a JSON file written by write_json_atomic (or any UTF-8 JSON file)"""
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
 
 def format_results(url, company_analysis, leads):
     """Format the final results for display and export"""
@@ -101,24 +132,20 @@ def truncate_text(text, max_length=100):
 
 def extract_emails_from_text(text):
     """Extract email addresses from text"""
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    return re.findall(email_pattern, text)
+    return _EMAIL_RE.findall(text)
 
 def extract_phone_numbers(text):
     """Extract phone numbers from text"""
-    # This is a simplified pattern - real implementation would be more complex
-    phone_pattern = r'(?:\+\d{1,3}[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}'
-    return re.findall(phone_pattern, text)
+    return _PHONE_RE.findall(text)
 
 def is_valid_email(email):
     """Check if an email address is valid"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_VALID_EMAIL_RE.match(email))
 
 def sanitize_filename(filename):
     """Sanitize a filename to be safe for file systems"""
     # Remove invalid characters
-    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+    filename = _INVALID_FILENAME_CHARS_RE.sub('', filename)
     # Replace spaces with underscores
     filename = filename.replace(' ', '_')
     # Limit length